@@ -0,0 +1,53 @@
+"""
+Every address in addresses.csv has an index, and that index is its row/column in the distance matrix. The routing code
+used to find a package's index with address_list.index(address), which walks the whole list comparing strings every
+time. Instead, we build an address book once: a hash table (our own, since we can't use dictionaries) that maps each
+address to its index. Each package then looks up its index once when it's loaded and keeps it, so the routing loop only
+ever deals with integers.
+
+Addresses are normalized before they go into (or get looked up in) the table, so small differences in spacing or
+upper/lower case like "410 S State St" vs "410 s  state st " still match.
+"""
+
+import csv
+from hashtable import MyHashTable
+
+
+# Lowercases an address and squashes any run of whitespace down to a single space
+def normalize_address(address):
+    return " ".join(address.split()).lower()
+
+
+class AddressBook:
+    def __init__(self):
+        self.addresses = [] # index -> address exactly as written in the csv
+        self.index_table = MyHashTable()  # normalized address -> index
+
+    def __len__(self):
+        return len(self.addresses)
+
+    # Adds an address at the given index (the csv gives us the index in the first column)
+    def add(self, index, address):
+        while len(self.addresses) <= index:
+            self.addresses.append(None)
+        self.addresses[index] = address
+        self.index_table.insert(normalize_address(address), index)
+
+    # Returns the matrix index for an address, or None if we don't know it
+    def index_of(self, address):
+        return self.index_table.get(normalize_address(address))
+
+    # The address that lives at an index (used for printing)
+    def address_at(self, index):
+        return self.addresses[index]
+
+
+# This loads the address data. Each row looks like: index,address
+def load_address_book(file_path):
+    book = AddressBook()
+    with open(file_path, 'r', encoding='utf-8-sig') as f: # utf-8-sig gets rid of the byte order mark Excel adds
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            book.add(int(row[0]), row[1])
+    return book
@@ -0,0 +1,101 @@
+"""
+Batch mode for the package tracker. Instead of typing one question at a time into the menu, we read a whole file of
+queries (or stdin) and answer them all in one go against the finished delivery timeline. Each line is a time and
+either a package ID or ALL:
+
+    09:30,14
+    10:25 ALL
+    # lines starting with # and blank lines are skipped
+
+The answers are streamed out as they're worked out (CSV or JSON lines), one row per package, so even millions of
+queries never have to sit in memory at once. Lines we can't understand are reported on stderr with their line number
+and skipped, the rest of the batch keeps going.
+"""
+
+import csv
+import json
+import sys
+from hashtable import MyHashTable
+from packages import DELIVERED, STATUS_NAMES
+from timeclock import parse_clock, format_clock
+
+BATCH_FORMATS = ("csv", "jsonl")
+CSV_COLUMNS = ("time", "package_id", "status", "delivered_at")
+
+
+# Splits one line into (clock seconds, package ID or None for ALL). Returns None for blank/comment lines.
+# day picks which day of the simulation the times are on (0 = the first day).
+def parse_query(line, day=0):
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    parts = line.replace(",", " ").split()
+    if len(parts) != 2:
+        raise ValueError("expected a time and a package ID (or ALL)")
+    check_time = parse_clock(parts[0], day)
+    if parts[1].upper() == "ALL":
+        return check_time, None
+    if not parts[1].isdigit():
+        raise ValueError(f"package ID '{parts[1]}' is not a whole number (or ALL)")
+    return check_time, int(parts[1])
+
+
+class CsvResultWriter:
+    def __init__(self, output):
+        self.writer = csv.writer(output, lineterminator="\n")
+        self.writer.writerow(CSV_COLUMNS)
+
+    def write(self, time_text, package_id, status, delivered_at):
+        self.writer.writerow((time_text, package_id, status, delivered_at or ""))
+
+
+class JsonLinesResultWriter:
+    def __init__(self, output):
+        self.output = output
+
+    def write(self, time_text, package_id, status, delivered_at):
+        self.output.write(json.dumps({"time": time_text, "package_id": package_id, "status": status,
+                                      "delivered_at": delivered_at}) + "\n")
+
+
+# Answers every query in lines and writes the results to output. Returns (queries answered, lines skipped).
+def run_batch(lines, delivery_timeline, output, output_format="csv", errors=sys.stderr, day=0):
+    if output_format not in BATCH_FORMATS:
+        raise ValueError(f"Unknown batch format '{output_format}'. Pick one of: {', '.join(BATCH_FORMATS)}")
+    writer = CsvResultWriter(output) if output_format == "csv" else JsonLinesResultWriter(output)
+
+    # Every package's delivery time as text, formatted once up front instead of once per answer
+    delivered_text = MyHashTable(max(len(delivery_timeline.packages), 1)) # package ID -> "HH:MM" delivery time
+    for pkg in delivery_timeline.packages:
+        delivered_text.insert(pkg.ID, format_clock(pkg.delivery_time, "24h") if pkg.delivery_time is not None else None)
+
+    answered = skipped = 0
+    last_all = None # (time, statuses) from the most recent ALL query, reused if the next one asks the same time
+    for line_number, line in enumerate(lines, 1):
+        try:
+            query = parse_query(line, day)
+        except ValueError as error:
+            print(f"Skipped batch line {line_number}: {error}", file=errors)
+            skipped += 1
+            continue
+        if query is None:
+            continue
+
+        check_time, package_id = query
+        time_text = format_clock(check_time, "24h")
+
+        if package_id is None:
+            if last_all is None or last_all[0] != check_time:
+                last_all = (check_time, delivery_timeline.statuses_at(check_time))
+            for pkg, status in zip(delivery_timeline.packages, last_all[1]):
+                writer.write(time_text, pkg.ID, STATUS_NAMES[status],
+                             delivered_text.get(pkg.ID) if status == DELIVERED else None)
+        else:
+            status = delivery_timeline.status_at(package_id, check_time)
+            if status is None:
+                writer.write(time_text, package_id, "Not found", None)
+            else:
+                writer.write(time_text, package_id, STATUS_NAMES[status],
+                             delivered_text.get(package_id) if status == DELIVERED else None)
+        answered += 1
+    return answered, skipped
@@ -0,0 +1,201 @@
+"""
+Benchmarks for the parts of the program that matter when the data gets big: the hash tables, the truck routing and the
+status queries. The real data is tiny (40 packages), so everything here runs on synthetic data from synthetic.py at
+whatever sizes you ask for.
+
+Run it from the src folder, for example:
+    python benchmark.py --sizes 1000 10000 100000 --output bench_results.json
+
+Each result is saved as one entry in a JSON file (benchmark name, variant, size, best time in seconds and operations
+per second), so two runs can be compared to catch slowdowns, or two hash table engines/routing modes compared
+against each other. Every timing is the best of --repeat runs.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+
+from events import QuietEventSink, using_event_sink
+from hashtable import new_hash_table, HASH_TABLE_ENGINES
+from packages import iter_package_batches
+from synthetic import generate_address_book, generate_distance_matrix, generate_packages, write_scenario_csvs
+from timeline import DeliveryTimeline
+from truck import Truck, ROUTING_MODES, route_cache
+from timeclock import at, format_clock
+from main import check_single_package_status, check_all_package_statuses
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DAY_START = at(8)
+
+
+# Runs func() `repeat` times and returns the fastest time. setup() (if given) runs before each try and isn't timed.
+def best_time(func, repeat, setup=None):
+    best = float('inf')
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        func(argument) if setup else func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def record(results, benchmark, variant, size, seconds, operations):
+    result = {
+        "benchmark": benchmark,
+        "variant": variant,
+        "size": size,
+        "seconds": seconds,
+        "ops_per_second": operations / seconds if seconds > 0 else None,
+    }
+    results.append(result)
+    print(f"{benchmark:<22} {variant:<10} {size:>9} {seconds:>10.4f}s {result['ops_per_second'] or 0:>14,.0f} ops/s")
+
+
+# insert / get (hits and misses) / remove on every hash table engine
+def bench_hashtable(results, size, repeat, seed):
+    keys = list(range(1, size + 1))
+    random.Random(seed).shuffle(keys)
+    missing = [key + size for key in keys]
+
+    for engine in HASH_TABLE_ENGINES:
+        def fill():
+            table = new_hash_table(engine)
+            for key in keys:
+                table.insert(key, key)
+            return table
+
+        record(results, "hashtable.insert", engine, size, best_time(fill, repeat), size)
+        table = fill()
+        record(results, "hashtable.get", engine, size,
+               best_time(lambda: [table.get(key) for key in keys], repeat), size)
+        record(results, "hashtable.get_missing", engine, size,
+               best_time(lambda: [table.get(key) for key in missing], repeat), size)
+        record(results, "hashtable.remove", engine, size,
+               best_time(lambda filled: [filled.remove(key) for key in keys], repeat, setup=fill), size)
+
+        # The bulk versions of the same operations
+        def fill_many():
+            table = new_hash_table(engine)
+            table.insert_many((key, key) for key in keys)
+            return table
+
+        record(results, "hashtable.insert_many", engine, size, best_time(fill_many, repeat), size)
+        record(results, "hashtable.get_many", engine, size, best_time(lambda: table.get_many(keys), repeat), size)
+        record(results, "hashtable.remove_many", engine, size,
+               best_time(lambda filled: filled.remove_many(keys), repeat, setup=fill_many), size)
+        record(results, "hashtable.items", engine, size, best_time(lambda: list(table.items()), repeat), size)
+
+
+# Loads every package onto one truck and times deliver_packages for each routing mode
+def bench_routing(results, size, repeat, seed, address_count):
+    book = generate_address_book(address_count)
+    matrix = generate_distance_matrix(address_count, seed)
+    packages = generate_packages(size, book, seed)
+    table = new_hash_table("chaining")
+    for package in packages:
+        table.insert(package.ID, package)
+    package_ids = [package.ID for package in packages]
+
+    for mode in ROUTING_MODES:
+        def loaded_truck():
+            route_cache.clear() # every repeat has to really plan the route, not get it back from the cache
+            truck = Truck("Bench", DAY_START, routing_mode=mode, table=table)
+            truck.load_packages(package_ids)
+            return truck
+
+        with using_event_sink(QuietEventSink()):
+            seconds = best_time(lambda truck: truck.deliver_packages(matrix), repeat, setup=loaded_truck)
+        record(results, "truck.deliver_packages", mode, size, seconds, size)
+
+
+# Builds a timeline for synthetic delivery times and times the status queries on it
+def bench_queries(results, size, repeat, seed, query_count):
+    book = generate_address_book(50)
+    packages = generate_packages(size, book, seed)
+    rng = random.Random(seed + 2)
+    for package in packages:
+        package.departure_time = DAY_START + at(0, rng.choice((0, 65, 140)))
+        package.delivery_time = package.departure_time + at(0, rng.randint(1, 240))
+        package.status = "Delivered"
+
+    record(results, "timeline.build", "", size, best_time(lambda: DeliveryTimeline(packages), repeat), size)
+    timeline = DeliveryTimeline(packages)
+    query_ids = [rng.randint(1, size) for _ in range(query_count)]
+    query_times = [DAY_START + at(0, rng.randint(-60, 420)) for _ in range(query_count)]
+    query_texts = [format_clock(check_time, "24h") for check_time in query_times]
+
+    record(results, "timeline.status_at", "", size,
+           best_time(lambda: [timeline.status_at(i, t) for i, t in zip(query_ids, query_times)], repeat), query_count)
+    all_queries = query_times[:10]
+    record(results, "timeline.statuses_at", "", size,
+           best_time(lambda: [timeline.statuses_at(t) for t in all_queries], repeat), len(all_queries))
+
+    # The functions the menu actually calls (their printing goes to devnull)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        seconds = best_time(lambda: [check_single_package_status(text, i, timeline)
+                                     for i, text in zip(query_ids, query_texts)], repeat)
+        record_single = (seconds, query_count)
+        seconds = best_time(lambda: check_all_package_statuses(query_texts[0], timeline), repeat)
+        record_all = (seconds, size)
+    record(results, "main.check_single", "", size, *record_single)
+    record(results, "main.check_all", "", size, *record_all)
+
+
+# Writes a synthetic manifest to disk and times streaming it back in
+def bench_loading(results, size, repeat, seed, scratch_directory):
+    scenario_directory = os.path.join(scratch_directory, f"scenario_{size}")
+    write_scenario_csvs(scenario_directory, size, 50, seed)
+    package_file = os.path.join(scenario_directory, "packages_data.csv")
+
+    def stream():
+        for _ in iter_package_batches(package_file):
+            pass
+    record(results, "packages.stream_load", "", size, best_time(stream, repeat), size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the WGUPS hash tables, routing and status queries.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="package counts to test")
+    parser.add_argument("--addresses", type=int, default=200, help="number of addresses for the routing benchmark")
+    parser.add_argument("--queries", type=int, default=10000, help="single package queries per size")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark (the best one is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", choices=("hashtable", "routing", "queries", "loading"), nargs="+",
+                        help="just run some of the benchmarks")
+    parser.add_argument("--scratch", default="bench_scratch", help="folder for generated csv files")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    selected = args.only or ("hashtable", "routing", "queries", "loading")
+    results = []
+    for size in args.sizes:
+        if "hashtable" in selected:
+            bench_hashtable(results, size, args.repeat, args.seed)
+        if "routing" in selected:
+            bench_routing(results, size, args.repeat, args.seed, args.addresses)
+        if "queries" in selected:
+            bench_queries(results, size, args.repeat, args.seed, args.queries)
+        if "loading" in selected:
+            bench_loading(results, size, args.repeat, args.seed, args.scratch)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+The distance table we were given (distances.csv) is lower-triangular, which means each distance only shows up once and
+the other half of the table is blank. Reading the raw csv rows during routing means checking for '' and calling float()
+on every single lookup, and the nearest neighbor loop does a LOT of lookups.
+
+So instead we read the csv once, turn every entry into a float, fill in the missing half (distance from A to B is the
+same as from B to A) and store the whole thing in one flat array of doubles. Looking up a distance is then just
+one multiplication and one index: values[row * size + column].
+"""
+
+import argparse
+import csv
+import mmap
+import struct
+from array import array
+
+
+class DistanceMatrix:
+    def __init__(self, size, values=None):
+        self.size = size # number of addresses (rows/columns)
+        # One contiguous block of doubles, row after row
+        self.values = values if values is not None else array('d', bytes(8 * size * size))
+        if len(self.values) != size * size:
+            raise ValueError(f"A {size}x{size} distance matrix needs {size * size} values, got {len(self.values)}.")
+        self.version = 0 # goes up every time a distance changes, so caches built on the old distances can tell
+
+    def __len__(self):
+        return self.size
+
+    # O(1) distance lookup between two address indexes
+    def distance(self, from_index, to_index):
+        return self.values[from_index * self.size + to_index]
+
+    # Sets the distance both ways so the matrix always stays symmetric
+    def set_distance(self, from_index, to_index, miles):
+        self.values[from_index * self.size + to_index] = miles
+        self.values[to_index * self.size + from_index] = miles
+        self.version += 1
+
+    # Returns one row (all distances from a single address) as a list, handy for scanning
+    def row(self, from_index):
+        start = from_index * self.size
+        return self.values[start:start + self.size].tolist()
+
+    # Reads a lower- (or upper-, or fully filled in) triangular distance table from a csv file
+    @classmethod
+    def from_csv(cls, file_path):
+        with open(file_path, 'r', encoding='utf-8-sig') as f:
+            rows = [row for row in csv.reader(f) if row]
+
+        size = len(rows)
+        matrix = cls(size)
+        for i, row in enumerate(rows):
+            for j in range(size):
+                cell = row[j].strip() if j < len(row) else ''
+                if cell == '':
+                    # Blank means "look at the mirrored entry", so we only complain if that one is blank too
+                    mirrored = rows[j][i].strip() if i < len(rows[j]) else ''
+                    if mirrored == '':
+                        raise ValueError(f"No distance between address {i} and {j} in {file_path}")
+                    continue
+                matrix.set_distance(i, j, float(cell))
+        return matrix
+
+
+"""
+Packed distance files, for networks far too big for a full matrix in memory.
+A full matrix stores every distance twice (A to B and B to A) and a 20,000 address network would need 400 million
+entries. The packed file only keeps the lower triangle (including the 0s on the diagonal), row after row, as raw 4 or
+8 byte floats after a small header. Entry (i, j) with i >= j is at position i * (i + 1) / 2 + j, so a lookup is
+still O(1). The file is memory-mapped instead of read, so opening it is instant and only the parts of the file that
+routing actually touches are ever loaded into memory (the operating system pages them in as needed).
+
+File layout (little-endian):
+    header: magic b"WGDM", format version, value type (b"f" = float32, b"d" = float64), 1 padding byte, size
+    values: size * (size + 1) / 2 floats, row 0 then row 1 and so on, each row from column 0 up to the diagonal
+"""
+
+PACKED_MAGIC = b"WGDM"
+PACKED_VERSION = 1
+PACKED_HEADER = struct.Struct("<4sHcxQ") # 16 bytes, so the floats after it are always lined up in memory
+PACKED_PRECISIONS = ("float32", "float64")
+_TYPE_CODES = (b"f", b"d") # array/memoryview type code for each precision
+
+
+def _triangle_index(i, j):
+    if i < j:
+        i, j = j, i
+    return i * (i + 1) // 2 + j
+
+
+class PackedDistanceMatrix:
+    def __init__(self, size, values, mapped_file=None, path=None):
+        self.size = size
+        self.values = values # memoryview (or array) of the packed lower triangle
+        self._mapped_file = mapped_file # the mmap behind values, kept open for as long as we use it
+        self.path = path # the file it was opened from, if any
+        self.version = 0 # read-only, so this never changes
+        if len(values) != size * (size + 1) // 2:
+            raise ValueError(f"A packed {size}x{size} distance matrix needs {size * (size + 1) // 2} values, "
+                             f"got {len(values)}.")
+
+    def __len__(self):
+        return self.size
+
+    # O(1) distance lookup between two address indexes (same as DistanceMatrix.distance)
+    def distance(self, from_index, to_index):
+        if from_index < to_index:
+            from_index, to_index = to_index, from_index
+        return self.values[from_index * (from_index + 1) // 2 + to_index]
+
+    # Every distance from one address as a list
+    def row(self, from_index):
+        start = from_index * (from_index + 1) // 2
+        row = self.values[start:start + from_index + 1].tolist() # the part of the row that's stored as-is
+        for to_index in range(from_index + 1, self.size): # the rest comes from the column below the diagonal
+            row.append(self.values[to_index * (to_index + 1) // 2 + from_index])
+        return row
+
+    # Copies everything into a normal (full, in-memory) DistanceMatrix
+    def to_matrix(self):
+        matrix = DistanceMatrix(self.size)
+        for i in range(self.size):
+            for j in range(i):
+                matrix.set_distance(i, j, self.distance(i, j))
+        return matrix
+
+    # A memoryview over an mmap can't be pickled, which worker processes started with spawn/forkserver need (fleet.py
+    # sends them the matrix). A matrix opened from a file is sent as its path and the worker maps the file itself;
+    # one that only lives in memory is sent as a plain array.
+    def __reduce__(self):
+        if self.path is not None:
+            return (type(self).open, (self.path,))
+        values = self.values if isinstance(self.values, array) else array(self.values.format, self.values)
+        return (type(self), (self.size, values))
+
+    def close(self):
+        if self._mapped_file is not None:
+            self.values.release()
+            self._mapped_file.close()
+            self._mapped_file = None
+
+    # Memory-maps a packed distance file
+    @classmethod
+    def open(cls, file_path):
+        with open(file_path, "rb") as f:
+            mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(mapped_file) < PACKED_HEADER.size:
+                raise ValueError(f"{file_path} is too short to be a packed distance file.")
+            magic, version, type_code, size = PACKED_HEADER.unpack_from(mapped_file, 0)
+            if magic != PACKED_MAGIC or version != PACKED_VERSION or type_code not in _TYPE_CODES:
+                raise ValueError(f"{file_path} is not a packed distance file this version can read.")
+            count = size * (size + 1) // 2
+            item_size = 4 if type_code == b"f" else 8
+            if len(mapped_file) != PACKED_HEADER.size + count * item_size:
+                raise ValueError(f"{file_path} should hold {count} distances but its size doesn't match.")
+            values = memoryview(mapped_file)[PACKED_HEADER.size:].cast(type_code.decode())
+        except Exception:
+            mapped_file.close()
+            raise
+        return cls(size, values, mapped_file, file_path)
+
+
+# Writes any distance matrix (anything with .size and .distance) to a packed file
+def write_packed_distances(matrix, file_path, precision="float64"):
+    type_code = _packed_type_code(precision)
+    with open(file_path, "wb") as f:
+        f.write(PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, type_code, matrix.size))
+        for i in range(matrix.size):
+            array(type_code.decode(), (matrix.distance(i, j) for j in range(i + 1))).tofile(f)
+
+
+# Converts a lower-triangular distances csv straight into a packed file, one row at a time, so even a csv far too big
+# to load as a matrix can be converted. Returns the number of addresses.
+def convert_csv_to_packed(csv_path, packed_path, precision="float64"):
+    type_code = _packed_type_code(precision)
+    size = 0
+    with open(csv_path, "r", encoding="utf-8-sig") as csv_file, open(packed_path, "wb") as f:
+        f.write(PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, type_code, 0)) # size gets filled in at the end
+        for row in csv.reader(csv_file):
+            if not row:
+                continue
+            i = size
+            cells = [cell.strip() for cell in row[:i + 1]]
+            if len(cells) < i + 1 or "" in cells:
+                raise ValueError(f"Row {i} of {csv_path} is missing distances below the diagonal "
+                                 f"(packing needs a lower-triangular table).")
+            array(type_code.decode(), map(float, cells)).tofile(f)
+            size += 1
+        f.seek(0)
+        f.write(PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, type_code, size))
+    return size
+
+
+def _packed_type_code(precision):
+    if precision not in PACKED_PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'. Pick one of: {', '.join(PACKED_PRECISIONS)}")
+    return _TYPE_CODES[PACKED_PRECISIONS.index(precision)]
+
+
+# True if the file starts with the packed distance file header
+def is_packed_distance_file(file_path):
+    with open(file_path, "rb") as f:
+        return f.read(len(PACKED_MAGIC)) == PACKED_MAGIC
+
+
+# Loads the distances into a matrix (same idea as load_package_data in packages.py). A packed file (see above) gets
+# memory-mapped, anything else is read as a csv.
+def load_distance_matrix(file_path):
+    if is_packed_distance_file(file_path):
+        return PackedDistanceMatrix.open(file_path)
+    return DistanceMatrix.from_csv(file_path)
+
+
+# Command line converter: python distances.py ../csv/distances.csv ../csv/distances.bin --precision float32
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a lower-triangular distances csv to a packed binary file.")
+    parser.add_argument("csv_file")
+    parser.add_argument("packed_file")
+    parser.add_argument("--precision", choices=PACKED_PRECISIONS, default="float64")
+    args = parser.parse_args(argv)
+    size = convert_csv_to_packed(args.csv_file, args.packed_file, args.precision)
+    print(f"Wrote {size} addresses ({size * (size + 1) // 2} distances, {args.precision}) to {args.packed_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+The delivery log. Trucks used to print() a line for every package they dropped off and another when they got back to
+the hub, which means building an f-string, formatting the time and writing to the terminal on every single delivery.
+On big runs (the benchmark, the scenario sweep) that printing took longer than the routing itself.
+Address corrections and packages a truck has to leave behind (unknown address) go through the same log.
+
+Now a truck just hands a small DeliveryEvent (what happened, which truck, when, where, the miles) to the current event
+sink, and the sink decides what to do with it. Events are only turned into text when a sink actually needs the text,
+so the quiet and collecting sinks never format anything at all. The sinks:
+
+- ConsoleEventSink:    prints the same lines as before (this is the default)
+- QuietEventSink:      throws every event away
+- CollectingEventSink: keeps the events in a list, for code that wants to look at them afterward
+- JsonLinesEventSink / CsvEventSink: buffer the events and write them to a file in batches
+
+Pick a sink for a part of the program with `with using_event_sink(QuietEventSink()):`, or for the rest of the run
+with set_event_sink().
+"""
+
+import csv
+import json
+from contextlib import contextmanager
+from timeclock import format_clock
+
+# Event kinds
+DEPARTED = "departed" # a truck was loaded and left the hub
+DELIVERED = "delivered" # one package was dropped off
+RETURNED = "returned" # a truck got back to the hub
+CORRECTED = "corrected" # we found out the right address for a package (no truck, location is the new address)
+SKIPPED = "skipped" # a package couldn't be loaded because its address isn't in the distance table
+
+EVENT_LOG_FORMATS = ("jsonl", "csv")
+CSV_COLUMNS = ("event", "truck", "time", "seconds", "location", "package_id", "miles", "total_miles", "package_ids",
+               "address")
+DEFAULT_BUFFER_SIZE = 1024 # events a file sink holds on to before writing them out
+
+
+# One thing that happened on the delivery day. Just the raw values, nothing is formatted until text() or a file sink
+# asks for it.
+class DeliveryEvent:
+    __slots__ = ("kind", "truck_name", "time", "location", "package_id", "miles", "total_miles", "package_ids",
+                 "address")
+
+    def __init__(self, kind, truck_name, time, location, package_id=None, miles=0.0, total_miles=0.0,
+                 package_ids=(), address=None):
+        self.kind = kind
+        self.truck_name = truck_name
+        self.time = time # clock seconds (see timeclock.py)
+        self.location = location # where the truck is once this has happened (0 is the hub)
+        self.package_id = package_id # only for DELIVERED, CORRECTED and SKIPPED
+        self.miles = miles # miles driven to get here (for DELIVERED this is the drive to the stop)
+        self.total_miles = total_miles # the truck's mileage so far
+        self.package_ids = package_ids # only for DEPARTED, everything the truck left with
+        self.address = address # only for CORRECTED (the full new address) and SKIPPED (the address we don't know)
+
+    # The line the program has always printed for this event
+    def text(self):
+        if self.kind == DELIVERED:
+            return (f"[{self.truck_name}] Delivered Package #{self.package_id} at {format_clock(self.time)} "
+                    f"(miles: {self.total_miles:.2f})")
+        if self.kind == RETURNED:
+            return (f"[{self.truck_name}] Returning to hub from address index {self.location} adds {self.miles:.2f} "
+                    f"miles for a total of {self.total_miles:.2f} miles.")
+        if self.kind == CORRECTED:
+            return f"[{format_clock(self.time)}] Address for package #{self.package_id} corrected to {self.address}"
+        if self.kind == SKIPPED:
+            return f"[{self.truck_name}] Skipping package #{self.package_id}: unknown address '{self.address}'"
+        return f"{self.truck_name} Packages (leaving at {format_clock(self.time)}): {list(self.package_ids)}"
+
+    # The values for one row of a file log, in CSV_COLUMNS order
+    def row(self):
+        return (self.kind, self.truck_name, format_clock(self.time, "24h"), self.time, self.location,
+                self.package_id, round(self.miles, 2), round(self.total_miles, 2), list(self.package_ids),
+                self.address)
+
+    def __str__(self):
+        return self.text()
+
+
+class ConsoleEventSink:
+    def emit(self, event):
+        print(event.text())
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class QuietEventSink:
+    def emit(self, event):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class CollectingEventSink:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+    # Only the events of one kind (or one truck)
+    def select(self, kind=None, truck_name=None):
+        return [event for event in self.events
+                if (kind is None or event.kind == kind) and (truck_name is None or event.truck_name == truck_name)]
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# Shared by the two file sinks: events pile up in a list and are only formatted and written once buffer_size of them
+# have come in (or on flush/close). The sink owns the file if it was given a path, otherwise closing the sink leaves
+# the file open for whoever passed it in.
+class _BufferedFileSink:
+    def __init__(self, output, buffer_size=DEFAULT_BUFFER_SIZE):
+        if buffer_size < 1:
+            raise ValueError("An event log buffer has to hold at least one event.")
+        self._owns_file = isinstance(output, str)
+        self.output = open(output, "w", encoding="utf-8", newline="") if self._owns_file else output
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self.events_written = 0
+
+    def emit(self, event):
+        self._buffer.append(event)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._write(self._buffer)
+            self.events_written += len(self._buffer)
+            self._buffer = []
+        self.output.flush()
+
+    def close(self):
+        if self.output is None:
+            return
+        self.flush()
+        if self._owns_file:
+            self.output.close()
+        self.output = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JsonLinesEventSink(_BufferedFileSink):
+    def _write(self, events):
+        self.output.write("".join(json.dumps(dict(zip(CSV_COLUMNS, event.row()))) + "\n" for event in events))
+
+
+class CsvEventSink(_BufferedFileSink):
+    def __init__(self, output, buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(output, buffer_size)
+        self.writer = csv.writer(self.output, lineterminator="\n")
+        self.writer.writerow(CSV_COLUMNS)
+
+    def _write(self, events):
+        rows = []
+        for event in events:
+            row = list(event.row())
+            row[8] = " ".join(str(package_id) for package_id in row[8]) # one column, ids split by spaces
+            rows.append(row)
+        self.writer.writerows(rows)
+
+
+# A file sink for path, picking the format from the name (.csv is CSV, anything else JSON lines) unless told
+def open_event_log(path, log_format=None, buffer_size=DEFAULT_BUFFER_SIZE):
+    if log_format is None:
+        log_format = "csv" if path.lower().endswith(".csv") else "jsonl"
+    if log_format not in EVENT_LOG_FORMATS:
+        raise ValueError(f"Unknown event log format '{log_format}'. Pick one of: {', '.join(EVENT_LOG_FORMATS)}")
+    sink_class = CsvEventSink if log_format == "csv" else JsonLinesEventSink
+    return sink_class(path, buffer_size)
+
+
+_sink = ConsoleEventSink()
+
+
+def get_event_sink():
+    return _sink
+
+
+# Makes sink the one every truck reports to and returns the one it replaced
+def set_event_sink(sink):
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
+
+
+# Uses sink for everything inside the with block, then flushes it and puts the old sink back
+@contextmanager
+def using_event_sink(sink):
+    previous = set_event_sink(sink)
+    try:
+        yield sink
+    finally:
+        set_event_sink(previous)
+        sink.flush()
+
+
+# Hands an event to the current sink
+def emit(event):
+    _sink.emit(event)
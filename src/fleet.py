@@ -0,0 +1,72 @@
+"""
+Planning several trucks at the same time.
+Working out a truck's route (compute_route in truck.py) only depends on its stops, the distance matrix and its start
+time, and it doesn't change any packages. So the routes for a whole fleet can be worked out side by side on a pool of
+processes, one truck per job.
+
+compute_fleet_routes only plans: it hands back one route per truck, in the order the trucks were given, and doesn't
+touch the trucks or their packages. Driving the routes is up to the caller. The simulation (simulation.py) plans
+every truck that leaves the hub at the same moment in one call, then turns each route into arrival and return events,
+and those events are what mark packages delivered. Because the events are handled in time order no matter which
+process planned which route, the printed log and the package data come out the same as planning the trucks one at a
+time.
+
+The distance matrix is sent to each worker process once when the pool starts, not once per truck.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pickle import PicklingError
+from truck import compute_route
+
+# The distance matrix for the worker process this code is running in (set by _start_worker)
+_worker_distance_data = None
+
+
+def _start_worker(distance_data):
+    global _worker_distance_data
+    _worker_distance_data = distance_data
+
+
+# One truck's planning job, run inside a worker process
+def _compute_route_job(job):
+    stop_locations, start_time, start_location, speed, routing_mode, improve_time_limit = job
+    return compute_route(stop_locations, _worker_distance_data, start_time, start_location, speed, routing_mode,
+                         improve_time_limit)
+
+
+# Everything compute_route needs to know about a truck, packed up so it can be sent to another process
+def _job_for(truck):
+    return (truck.stop_locations(), truck.time, truck.current_location, truck.speed, truck.routing_mode,
+            truck.improve_time_limit)
+
+
+# Starting a pool and sending it the distance matrix takes a moment, so for a couple of small routes it's quicker to
+# just plan them here. Below this many stops (for all the trucks together) we don't bother with worker processes.
+PARALLEL_MIN_STOPS = 200
+
+
+# Whether planning these trucks on a pool of processes is likely to be faster than one after another
+def worth_planning_in_parallel(trucks):
+    return (len(trucks) > 1 and (os.cpu_count() or 1) > 1
+            and sum(len(truck.stops) for truck in trucks) >= PARALLEL_MIN_STOPS)
+
+
+# Plans every truck's route and returns the results in the same order as the trucks.
+# workers=None lets the pool pick (one process per CPU). parallel=None decides with worth_planning_in_parallel, and
+# with parallel=False (or just one truck) it all runs right here.
+def compute_fleet_routes(trucks, distance_data, workers=None, parallel=None):
+    if parallel is None:
+        parallel = worth_planning_in_parallel(trucks)
+    jobs = [_job_for(truck) for truck in trucks]
+    if parallel and len(jobs) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker,
+                                     initargs=(distance_data,)) as pool:
+                return list(pool.map(_compute_route_job, jobs))
+        except (OSError, NotImplementedError, PicklingError, TypeError, BrokenProcessPool) as error:
+            # Some systems can't start worker processes, and a matrix that can't be pickled (for spawn/forkserver pools)
+            # breaks the pool before any job runs. The answer is the same either way, it just takes longer.
+            print(f"Could not start worker processes ({error}), planning the routes one at a time instead.")
+    return [truck.compute_route(distance_data) for truck in trucks]
@@ -12,20 +12,88 @@ data components like:
 •   delivery zip code
 •   package weight
 •   delivery status (i.e., at the hub, en route, or delivered), including the delivery time
+
+The table also resizes itself. Once the number of items divided by the number of buckets (the "load factor") goes over
+max_load_factor, we double the bucket count so the chains stay short and insert/get/remove stay O(1) no matter how many
+packages we have. If min_load_factor is set, the table will also shrink again after lots of removes.
+Rather than moving every item into the bigger array in one go (which would make that one insert really slow), we keep
+the old bucket array around and move a couple of its buckets over on every operation. This is called incremental
+rehashing. Until it's done, lookups just check both arrays.
+
+For working on lots of keys at once there's get_many / insert_many / remove_many (one call for the whole batch instead
+of one per key), and keys() / values() / items() / `for key in table` to go through everything that's stored, so we
+never have to guess which IDs exist.
 """
 
+# Stand-in "not found" value for __contains__, since None can be a real stored value
+_MISSING = object()
+
+
+# Deletes key from a bucket (a list of (key, value) pairs, or None for an empty one) and says whether it was there
+def _remove_from(bucket, key):
+    if bucket is not None:
+        for i, (k, v) in enumerate(bucket):
+            if k == key:
+                del bucket[i]
+                return True
+    return False
+
+
 # First we create our class.
 class MyHashTable:
+    # How many old buckets we move into the new array on every insert/get/remove while a rehash is in progress.
+    REHASH_STEP = 4
+
     # First we will create our constructor
     # First we'll start with a bunch of empty buckets (we'll name it array instead of list)
-    def __init__(self, size=40): # Size will be determined by the number of packages, in this case 40.
-        self.bucket_array = [[] for _ in range(size)] # 40 empty buckets
+    def __init__(self, size=40, max_load_factor=0.75, min_load_factor=None): # Size will be determined by the number of packages, in this case 40.
+        if size < 1:
+            raise ValueError("Hash table size must be at least 1.")
+        if min_load_factor is not None and min_load_factor * 4 > max_load_factor:
+            # If the two are too close together the table would keep growing and shrinking back and forth
+            raise ValueError("min_load_factor must be at most a quarter of max_load_factor.")
+        self.bucket_array = [None] * size # 40 empty buckets (a bucket only gets its list once something goes in it)
+        self.max_load_factor = max_load_factor
+        self.min_load_factor = min_load_factor # None means we never shrink
+        self.min_size = size # we never shrink below the size we started with
+        self.count = 0 # how many key-value pairs are stored right now
+
+        # These are only used while an incremental rehash is happening
+        self.old_bucket_array = None
+        self.rehash_index = 0 # every old bucket before this index has already been moved over
+
+    # Lets us use len(table) just like a normal list
+    def __len__(self):
+        return self.count
+
+    # The number of buckets in the (newest) bucket array
+    def capacity(self):
+        return len(self.bucket_array)
+
+    def load_factor(self):
+        return self.count / len(self.bucket_array)
+
+    # True while we still have an old bucket array that hasn't been fully moved over
+    def is_rehashing(self):
+        return self.old_bucket_array is not None
 
     # Now time for the insert function, which will add an item to our hash table. The value parameter will be the entire
     # Package object, which includes the package ID and all other info.
     def insert(self, key, value): #
+        self._rehash_step()
+
+        # During a rehash the key might still be sitting in an old bucket. If so we update it right there.
+        old_bucket = self._old_bucket_for(key)
+        if old_bucket is not None:
+            for i, (k, v) in enumerate(old_bucket):
+                if k == key:
+                    old_bucket[i] = (key, value)
+                    return
+
         index = hash(key) % len(self.bucket_array)
         bucket = self.bucket_array[index]
+        if bucket is None:
+            bucket = self.bucket_array[index] = []
 
         # If a key exists, then we will update it. Otherwise, we will add it to our hash table.
         # I like to use enumerate because it keeps track of both the value AND the index in our for loops
@@ -34,25 +102,433 @@ class MyHashTable:
                 bucket[i] = (key, value)
                 return
         bucket.append((key, value))
+        self.count += 1
+
+        if self.count > self.max_load_factor * len(self.bucket_array):
+            self._start_rehash(len(self.bucket_array) * 2)
 
     # This function will look up an item based on our key.
     def get(self, key):
+        self._rehash_step()
+
         index = hash(key) % len(self.bucket_array)
         bucket = self.bucket_array[index]
 
-        for k, v in bucket:
+        for k, v in bucket or ():
             if k == key: # If this happens then we found our item
                 return v
+
+        # Not in the new array, but it might not have been moved over yet
+        old_bucket = self._old_bucket_for(key)
+        if old_bucket is not None:
+            for k, v in old_bucket:
+                if k == key:
+                    return v
         return None
 
     # This will remove a specified item
     def remove(self, key):
+        self._rehash_step()
+
         index = hash(key) % len(self.bucket_array)
         bucket = self.bucket_array[index]
 
         # Once again using the enumerate function
-        for i, (k, v) in enumerate(bucket):
+        removed = False
+        for i, (k, v) in enumerate(bucket or ()):
             if k == key:
                 del bucket[i]
-                return True
+                removed = True
+                break
+
+        if not removed:
+            old_bucket = self._old_bucket_for(key)
+            if old_bucket is not None:
+                for i, (k, v) in enumerate(old_bucket):
+                    if k == key:
+                        del old_bucket[i]
+                        removed = True
+                        break
+
+        if not removed:
+            return False
+
+        self.count -= 1
+        if (self.min_load_factor is not None and len(self.bucket_array) > self.min_size
+                and self.count < self.min_load_factor * len(self.bucket_array)):
+            self._start_rehash(max(self.min_size, len(self.bucket_array) // 2))
+        return True
+
+    # Inserts a whole batch of (key, value) pairs. If the batch would push us over the load factor we grow to a size
+    # that fits all of it up front, instead of doubling several times part way through the batch. Then the whole batch
+    # goes straight into its buckets without the per-call rehash step and load factor check insert() does.
+    def insert_many(self, items):
+        items = list(items)
+        needed = self.count + len(items)
+        if needed > self.max_load_factor * len(self.bucket_array):
+            new_size = len(self.bucket_array)
+            while needed > self.max_load_factor * new_size:
+                new_size *= 2
+            self._start_rehash(new_size)
+        # Bulk work isn't a single slow insert we need to spread out, so just finish any rehash and use one array
+        self._finish_rehash()
+        bucket_array = self.bucket_array
+        size = len(bucket_array)
+        for key, value in items:
+            index = hash(key) % size
+            bucket = bucket_array[index]
+            if bucket is None:
+                bucket = bucket_array[index] = []
+            for i, (k, v) in enumerate(bucket):
+                if k == key:
+                    bucket[i] = (key, value)
+                    break
+            else:
+                bucket.append((key, value))
+                self.count += 1
+
+    # Looks up a whole batch of keys and returns their values in the same order (default for missing keys).
+    # Each key is hashed once and its bucket scanned right here, instead of paying for a get() call per key. Like get(),
+    # this never finishes a rehash in one go: a key that's missing from the new array is looked for in the old one.
+    def get_many(self, keys, default=None):
+        self._rehash_step()
+        bucket_array = self.bucket_array
+        size = len(bucket_array)
+        values = []
+        for key in keys:
+            for k, v in bucket_array[hash(key) % size] or ():
+                if k == key:
+                    values.append(v)
+                    break
+            else:
+                value = default
+                old_bucket = self._old_bucket_for(key)
+                if old_bucket is not None:
+                    for k, v in old_bucket:
+                        if k == key:
+                            value = v
+                            break
+                values.append(value)
+        return values
+
+    # Removes a whole batch of keys and returns how many were actually in the table. Shrinking (if min_load_factor is
+    # set) is only checked once at the end instead of after every single remove. Keys that haven't been moved over yet
+    # are removed from the old array, same as remove().
+    def remove_many(self, keys):
+        self._rehash_step()
+        bucket_array = self.bucket_array
+        size = len(bucket_array)
+        removed = 0
+        for key in keys:
+            if _remove_from(bucket_array[hash(key) % size], key) or _remove_from(self._old_bucket_for(key), key):
+                removed += 1
+        self.count -= removed
+        if self.min_load_factor is not None and size > self.min_size and self.count < self.min_load_factor * size:
+            new_size = size
+            while new_size > self.min_size and self.count < self.min_load_factor * new_size:
+                new_size //= 2
+            self._start_rehash(max(self.min_size, new_size))
+        return removed
+
+    # Every (key, value) pair in the table (in no particular order). Works in the middle of a rehash too: the old
+    # buckets that haven't been moved yet are read from the old array.
+    def items(self):
+        if self.old_bucket_array is not None:
+            for index in range(self.rehash_index, len(self.old_bucket_array)):
+                yield from self.old_bucket_array[index] or ()
+        for bucket in self.bucket_array:
+            if bucket is not None:
+                yield from bucket
+
+    def keys(self):
+        for k, v in self.items():
+            yield k
+
+    def values(self):
+        for k, v in self.items():
+            yield v
+
+    # So we can write `for key in table:` and `key in table`
+    def __iter__(self):
+        return self.keys()
+
+    def __contains__(self, key):
+        return self.get_many((key,), _MISSING)[0] is not _MISSING
+
+    # Returns the old bucket a key would be in, but only if that bucket hasn't been moved over yet
+    def _old_bucket_for(self, key):
+        if self.old_bucket_array is None:
+            return None
+        index = hash(key) % len(self.old_bucket_array)
+        if index < self.rehash_index:
+            return None # already moved, so the key can only be in the new array
+        return self.old_bucket_array[index]
+
+    # Swaps in a new, empty bucket array of the given size and starts moving the old items into it bit by bit.
+    # The new array is all None (one fast fill) rather than a fresh list per bucket, which for millions of buckets
+    # would make the insert that starts the rehash a slow one; each bucket gets its list when its first item arrives.
+    def _start_rehash(self, new_size):
+        # If we're still in the middle of the last rehash we finish it first so there are only ever two arrays
+        self._finish_rehash()
+        self.old_bucket_array = self.bucket_array
+        self.bucket_array = [None] * new_size
+        self.rehash_index = 0
+
+    # Moves a few old buckets over into the new array
+    def _rehash_step(self, steps=REHASH_STEP):
+        if self.old_bucket_array is None:
+            return
+        new_array = self.bucket_array
+        new_size = len(new_array)
+        old_size = len(self.old_bucket_array)
+        while steps > 0 and self.rehash_index < old_size:
+            for k, v in self.old_bucket_array[self.rehash_index] or ():
+                index = hash(k) % new_size
+                if new_array[index] is None:
+                    new_array[index] = [(k, v)]
+                else:
+                    new_array[index].append((k, v))
+            self.old_bucket_array[self.rehash_index] = None # let go of the old list
+            self.rehash_index += 1
+            steps -= 1
+        if self.rehash_index >= old_size:
+            self.old_bucket_array = None
+            self.rehash_index = 0
+
+    # Moves everything that's left over in one go
+    def _finish_rehash(self):
+        if self.old_bucket_array is not None:
+            self._rehash_step(len(self.old_bucket_array))
+
+
+"""
+Second engine: open addressing.
+Instead of a list per bucket with a tuple per item, this one keeps all the keys in one flat list and all the values in
+another flat list of the same length (parallel arrays). To find a key we start at its hash slot and walk forward one
+slot at a time (linear probing) until we find it or hit an empty slot. That's a lot less memory per package than the
+chained version, and walking neighbouring slots of a list is much friendlier to the CPU cache than hopping between lots
+of little bucket lists.
+
+When we remove something we can't just empty its slot, because that would break the probe chain for any key that got
+pushed past it. So we leave a "tombstone" there instead: lookups walk over it, and inserts are allowed to reuse it.
+The slot count is always a power of two so we can use a bit mask instead of % to wrap around. Python's hash of an int
+is just the int itself, so package IDs 1, 2, 3... would all land next to each other and form one giant run of full
+slots that lookups have to walk through. To stop that we scramble the hash first by multiplying it by a big odd
+number and keeping the top bits (this trick is called Fibonacci hashing).
+It has the exact same insert/get/remove API as MyHashTable, so either one can be used for the package table.
+"""
+
+# Marker objects for slots that have never been used and slots whose item was removed
+_EMPTY = object()
+_TOMBSTONE = object()
+
+# 2^64 divided by the golden ratio, used to scramble hashes. Any large odd number spreads keys out, this one does it best.
+_FIBONACCI_MULTIPLIER = 11400714819323198485
+_MASK_64 = (1 << 64) - 1
+
+
+class OpenAddressHashTable:
+    def __init__(self, size=40, max_load_factor=0.7, min_load_factor=None):
+        if size < 1:
+            raise ValueError("Hash table size must be at least 1.")
+        if not 0 < max_load_factor < 1:
+            raise ValueError("max_load_factor must be between 0 and 1 for open addressing.")
+        if min_load_factor is not None and min_load_factor * 4 > max_load_factor:
+            raise ValueError("min_load_factor must be at most a quarter of max_load_factor.")
+        self.max_load_factor = max_load_factor
+        self.min_load_factor = min_load_factor
+        self.min_size = self._slots_for(size)
+        self.count = 0 # live items
+        self.tombstones = 0 # removed items that still take up a slot
+        self._allocate(self.min_size)
+
+    def __len__(self):
+        return self.count
+
+    def capacity(self):
+        return len(self.slot_keys)
+
+    def load_factor(self):
+        return self.count / len(self.slot_keys)
+
+    # Open addressing rebuilds in one go, so there's never a rehash "in progress"
+    def is_rehashing(self):
         return False
+
+    def insert(self, key, value):
+        keys = self.slot_keys
+        mask = self.mask
+        index = ((hash(key) * _FIBONACCI_MULTIPLIER) & _MASK_64) >> self.shift
+        first_tombstone = -1
+
+        while True:
+            k = keys[index]
+            if k is _EMPTY:
+                break
+            if k is _TOMBSTONE:
+                if first_tombstone < 0:
+                    first_tombstone = index # remember it so we can reuse it if the key isn't already here
+            elif k == key:
+                self.slot_values[index] = value # key already exists so we just update it
+                return
+            index = (index + 1) & mask
+
+        if first_tombstone >= 0:
+            index = first_tombstone
+            self.tombstones -= 1
+        keys[index] = key
+        self.slot_values[index] = value
+        self.count += 1
+
+        # Tombstones make probe chains longer just like live items do, so they count towards the load
+        if self.count + self.tombstones > self.max_load_factor * len(keys):
+            # Only grow if it's the live items that filled us up, otherwise just clean out the tombstones
+            if self.count > self.max_load_factor * len(keys) / 2:
+                self._resize(len(keys) * 2)
+            else:
+                self._resize(len(keys))
+
+    def get(self, key):
+        index = self._find(key)
+        if index < 0:
+            return None
+        return self.slot_values[index]
+
+    def remove(self, key):
+        index = self._find(key)
+        if index < 0:
+            return False
+        self.slot_keys[index] = _TOMBSTONE
+        self.slot_values[index] = None # don't hang on to the removed package
+        self.count -= 1
+        self.tombstones += 1
+
+        if (self.min_load_factor is not None and len(self.slot_keys) > self.min_size
+                and self.count < self.min_load_factor * len(self.slot_keys)):
+            self._resize(max(self.min_size, len(self.slot_keys) // 2))
+        return True
+
+    # Inserts a whole batch of (key, value) pairs, growing once up front if the batch won't fit
+    def insert_many(self, items):
+        items = list(items)
+        slots = self._slots_for(self.count + self.tombstones + len(items))
+        if slots > len(self.slot_keys):
+            self._resize(slots)
+        for key, value in items:
+            self.insert(key, value)
+
+    # Looks up a whole batch of keys and returns their values in the same order (default for missing keys).
+    # The probing is done right here so there's no get()/_find() call per key.
+    def get_many(self, keys, default=None):
+        table_keys = self.slot_keys
+        table_values = self.slot_values
+        mask = self.mask
+        shift = self.shift
+        values = []
+        for key in keys:
+            index = ((hash(key) * _FIBONACCI_MULTIPLIER) & _MASK_64) >> shift
+            while True:
+                k = table_keys[index]
+                if k is _EMPTY:
+                    values.append(default)
+                    break
+                if k is not _TOMBSTONE and k == key:
+                    values.append(table_values[index])
+                    break
+                index = (index + 1) & mask
+        return values
+
+    # Removes a whole batch of keys and returns how many were actually in the table. The shrink check only happens
+    # once at the end.
+    def remove_many(self, keys):
+        removed = 0
+        for key in keys:
+            index = self._find(key)
+            if index >= 0:
+                self.slot_keys[index] = _TOMBSTONE
+                self.slot_values[index] = None
+                removed += 1
+        self.count -= removed
+        self.tombstones += removed
+        if (self.min_load_factor is not None and len(self.slot_keys) > self.min_size
+                and self.count < self.min_load_factor * len(self.slot_keys)):
+            self._resize(max(self.min_size, self._slots_for(self.count)))
+        return removed
+
+    # Every (key, value) pair in the table (in slot order, which has nothing to do with insert order)
+    def items(self):
+        for k, v in zip(self.slot_keys, self.slot_values):
+            if k is not _EMPTY and k is not _TOMBSTONE:
+                yield k, v
+
+    def keys(self):
+        for k, v in self.items():
+            yield k
+
+    def values(self):
+        for k, v in self.items():
+            yield v
+
+    def __iter__(self):
+        return self.keys()
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    # Returns the slot a key is stored in, or -1 if it isn't in the table
+    def _find(self, key):
+        keys = self.slot_keys
+        mask = self.mask
+        index = ((hash(key) * _FIBONACCI_MULTIPLIER) & _MASK_64) >> self.shift
+        while True:
+            k = keys[index]
+            if k is _EMPTY:
+                return -1
+            if k is not _TOMBSTONE and k == key:
+                return index
+            index = (index + 1) & mask
+
+    # Smallest power of two that holds `size` items without going over the load factor
+    def _slots_for(self, size):
+        slots = 8
+        while slots * self.max_load_factor < size:
+            slots *= 2
+        return slots
+
+    def _allocate(self, slots):
+        self.slot_keys = [_EMPTY] * slots
+        self.slot_values = [None] * slots
+        self.mask = slots - 1
+        self.shift = 64 - (slots.bit_length() - 1) # keep the top log2(slots) bits of the scrambled hash
+
+    # Rebuilds the arrays at the new size, putting every live item back in and dropping all the tombstones
+    def _resize(self, slots):
+        old_keys = self.slot_keys
+        old_values = self.slot_values
+        self._allocate(slots)
+        keys = self.slot_keys
+        values = self.slot_values
+        mask = self.mask
+        shift = self.shift
+        for k, v in zip(old_keys, old_values):
+            if k is _EMPTY or k is _TOMBSTONE:
+                continue
+            index = ((hash(k) * _FIBONACCI_MULTIPLIER) & _MASK_64) >> shift
+            while keys[index] is not _EMPTY:
+                index = (index + 1) & mask
+            keys[index] = k
+            values[index] = v
+        self.tombstones = 0
+
+
+# The names we can pick the package table engine by
+HASH_TABLE_ENGINES = ("chaining", "open")
+
+
+# Builds an empty hash table using whichever engine is asked for
+def new_hash_table(engine="chaining", size=40, **options):
+    if engine == "chaining":
+        return MyHashTable(size, **options)
+    if engine == "open":
+        return OpenAddressHashTable(size, **options)
+    raise ValueError(f"Unknown hash table engine '{engine}'. Pick one of: {', '.join(HASH_TABLE_ENGINES)}")
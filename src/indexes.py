@@ -0,0 +1,223 @@
+"""
+Secondary indexes for the package table.
+The hash table can only find a package by its ID. To answer questions like "which packages aren't delivered yet?" or
+"what's due by 10:30 in zip 84115?" we used to loop over every ID from 1 to 40 and check each package. Instead,
+IndexedPackageTable wraps the hash table and keeps a few extra lookups up to date as packages change:
+
+- status   -> the IDs of every package with that status ("At hub", "En route", "Delivered")
+- zip code -> the IDs of every package going to that zip code
+- address  -> the IDs of every package going to that (normalized) address
+- deadline -> a sorted list of (deadline, ID), so "everything due by X" is a binary search plus the matching part
+              (after a bulk insert it's sorted once, the next time it's used)
+
+Packages tell the table themselves whenever their status, address, zip code or deadline changes (see the property
+setters on Package), so the trucks and the simulation don't have to do anything special. A query only costs time for
+the packages it actually returns (plus the binary search for deadlines).
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from addresses import normalize_address
+from hashtable import MyHashTable
+
+
+class IndexedPackageTable:
+    def __init__(self, table):
+        self.table = table # the real hash table: package ID -> package
+        self.ids = set() # every package ID in the table
+        self.status_index = MyHashTable(4) # status -> set of IDs
+        self.zip_index = MyHashTable() # zip code -> set of IDs
+        self.address_index = MyHashTable() # normalized address -> set of IDs
+        self.deadline_index = [] # (deadline in minutes, ID), sorted whenever deadline_sorted is True
+        self.deadline_sorted = True
+
+    # The same insert/get/remove API as the hash tables, so this can be used anywhere they are
+    def __len__(self):
+        return len(self.table)
+
+    def get(self, package_id):
+        return self.table.get(package_id)
+
+    def insert(self, package_id, package):
+        old = self.table.get(package_id)
+        if old is not None:
+            self._unindex(old)
+        self.table.insert(package_id, package)
+        self._index(package)
+
+    # Like insert() for a whole batch. If an ID shows up more than once the last one wins (same as inserting them one
+    # after another). The batch's deadlines are just added to the end of the deadline index, which then gets sorted
+    # once the next time something needs it, so loading lots of batches in a row costs one sort instead of an insort
+    # (or a re-sort) per package.
+    def insert_many(self, items):
+        seen = set()
+        unique = []
+        for package_id, package in reversed(list(items)):
+            if package_id not in seen:
+                seen.add(package_id)
+                unique.append((package_id, package))
+        unique.reverse()
+
+        replaced = [old for old in self.table.get_many([package_id for package_id, _ in unique]) if old is not None]
+        for old in replaced:
+            self._unindex(old, deadline=False)
+        if replaced:
+            stale = set((old.deadline, old.ID) for old in replaced)
+            self.deadline_index = [entry for entry in self.deadline_index if entry not in stale]
+
+        self.table.insert_many(unique)
+        for _, package in unique:
+            self._index(package, deadline=False)
+        if unique:
+            self.deadline_index.extend((package.deadline, package.ID) for _, package in unique)
+            self.deadline_sorted = False
+
+    def remove(self, package_id):
+        package = self.table.get(package_id)
+        if package is None:
+            return False
+        self._unindex(package)
+        return self.table.remove(package_id)
+
+    def get_many(self, package_ids, default=None):
+        return self.table.get_many(package_ids, default)
+
+    def remove_many(self, package_ids):
+        package_ids = list(package_ids)
+        for package in self.table.get_many(package_ids):
+            if package is not None:
+                self._unindex(package)
+        return self.table.remove_many(package_ids)
+
+    def keys(self):
+        return self.table.keys()
+
+    def values(self):
+        return self.table.values()
+
+    def items(self):
+        return self.table.items()
+
+    def __iter__(self):
+        return iter(self.table)
+
+    def __contains__(self, package_id):
+        return package_id in self.table
+
+    # ---- queries (all return sorted lists of package IDs) ----
+
+    # Every package ID in the table
+    def all_ids(self):
+        return sorted(self.ids)
+
+    # Every package in the table, in ID order
+    def all_packages(self):
+        return self.table.get_many(self.all_ids())
+
+    def ids_with_status(self, status):
+        return sorted(self.status_index.get(status) or ())
+
+    # Everything that hasn't been delivered yet (at the hub or en route)
+    def undelivered_ids(self):
+        return sorted((self.status_index.get("At hub") or set()) | (self.status_index.get("En route") or set()))
+
+    def ids_in_zip(self, zip_code):
+        return sorted(self.zip_index.get(int(zip_code)) or ())
+
+    def ids_at_address(self, address):
+        return sorted(self.address_index.get(normalize_address(address)) or ())
+
+    # Packages with a deadline between earliest and latest (minutes after midnight, both included)
+    def ids_due_between(self, earliest, latest):
+        deadlines = self._sorted_deadlines()
+        start = bisect_left(deadlines, (earliest, float('-inf')))
+        end = bisect_right(deadlines, (latest, float('inf')))
+        return sorted(package_id for _, package_id in deadlines[start:end])
+
+    def ids_due_by(self, latest):
+        return self.ids_due_between(float('-inf'), latest)
+
+    # Any mix of the above, e.g. find(status="At hub", zip_code=84115, due_by=630).
+    # We start from whichever index gives the fewest packages and just check the rest of the conditions on those.
+    def find(self, status=None, zip_code=None, address=None, due_by=None):
+        candidate_sets = []
+        if status is not None:
+            candidate_sets.append(self.status_index.get(status) or set())
+        if zip_code is not None:
+            candidate_sets.append(self.zip_index.get(int(zip_code)) or set())
+        if address is not None:
+            candidate_sets.append(self.address_index.get(normalize_address(address)) or set())
+
+        if due_by is not None:
+            due = self.ids_due_by(due_by)
+            if not candidate_sets or len(due) <= min(len(ids) for ids in candidate_sets):
+                return [package_id for package_id in due if all(package_id in ids for ids in candidate_sets)]
+            candidate_sets.append(set(due))
+        if not candidate_sets:
+            return self.all_ids()
+
+        candidate_sets.sort(key=len)
+        smallest, others = candidate_sets[0], candidate_sets[1:]
+        return sorted(package_id for package_id in smallest if all(package_id in ids for ids in others))
+
+    # ---- keeping the indexes up to date ----
+
+    # deadline=False leaves the deadline index alone, for bulk work that updates it in one go
+    def _index(self, package, deadline=True):
+        self.ids.add(package.ID)
+        self._add_to(self.status_index, package.status, package.ID)
+        self._add_to(self.zip_index, package.zip_code, package.ID)
+        self._add_to(self.address_index, normalize_address(package.address), package.ID)
+        if deadline:
+            insort(self._sorted_deadlines(), (package.deadline, package.ID))
+        package.index = self
+
+    def _unindex(self, package, deadline=True):
+        self.ids.discard(package.ID)
+        self._remove_from(self.status_index, package.status, package.ID)
+        self._remove_from(self.zip_index, package.zip_code, package.ID)
+        self._remove_from(self.address_index, normalize_address(package.address), package.ID)
+        if deadline:
+            self._remove_deadline(package.deadline, package.ID)
+        package.index = None
+
+    # Called by a Package when one of its indexed fields changes
+    def field_changed(self, package, field, old_value, new_value):
+        if field == "status":
+            self._remove_from(self.status_index, old_value, package.ID)
+            self._add_to(self.status_index, new_value, package.ID)
+        elif field == "zip_code":
+            self._remove_from(self.zip_index, old_value, package.ID)
+            self._add_to(self.zip_index, new_value, package.ID)
+        elif field == "address":
+            self._remove_from(self.address_index, normalize_address(old_value), package.ID)
+            self._add_to(self.address_index, normalize_address(new_value), package.ID)
+        elif field == "deadline":
+            self._remove_deadline(old_value, package.ID)
+            insort(self._sorted_deadlines(), (new_value, package.ID))
+
+    def _add_to(self, index, key, package_id):
+        ids = index.get(key)
+        if ids is None:
+            ids = set()
+            index.insert(key, ids)
+        ids.add(package_id)
+
+    def _remove_from(self, index, key, package_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(package_id)
+            if not ids:
+                index.remove(key)
+
+    # The deadline index, sorted first if a bulk insert left it unsorted
+    def _sorted_deadlines(self):
+        if not self.deadline_sorted:
+            self.deadline_index.sort()
+            self.deadline_sorted = True
+        return self.deadline_index
+
+    def _remove_deadline(self, deadline, package_id):
+        deadlines = self._sorted_deadlines()
+        position = bisect_left(deadlines, (deadline, package_id))
+        if position < len(deadlines) and deadlines[position] == (deadline, package_id):
+            del deadlines[position]
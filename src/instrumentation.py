@@ -0,0 +1,211 @@
+"""
+Optional counters and timers for the hot parts of the program, so we can see where the time actually goes.
+
+It's off by default and then costs nothing at all: instead of checking an "is it on?" flag inside distance() or
+MyHashTable.get() on every call, enable() swaps those functions for wrapped versions that count (and sometimes time)
+each call, and disable() puts the originals back. What gets measured:
+
+- distance lookups (DistanceMatrix.distance)
+- hash table lookups (MyHashTable.get, and every OpenAddressHashTable probe sequence through _find), plus one for
+  every key looked up with get_many (which also covers `key in table`), since that skips get/_find
+- routing: nearest stop searches, 2-opt and Or-opt passes, route improvement
+- wall time per truck (Truck.compute_route) and for the whole simulation
+- status queries against the timeline
+- phases of the program (loading, routing, queries), marked with `with phase("load"):` around each part
+
+Call report() for a table of everything, or snapshot() to get the numbers. Route planning done in worker processes
+(fleet.py) isn't counted since those processes have their own copy of this module.
+"""
+
+import importlib
+import time
+from contextlib import contextmanager
+from hashtable import MyHashTable
+
+
+# One counter: how many times something happened and (if it's timed) the total seconds spent in it
+class Stat:
+    __slots__ = ("name", "count", "seconds", "timed")
+
+    def __init__(self, name, timed):
+        self.name = name
+        self.count = 0
+        self.seconds = 0.0
+        self.timed = timed
+
+
+# (module, class name or None, function name, "count" / "count_keys" / "time" / "truck", stat name).
+# "count_keys" counts one per key for functions whose first argument (after self) is a batch of keys.
+HOOKS = (
+    ("distances", "DistanceMatrix", "distance", "count", "distance.lookups"),
+    ("distances", "PackedDistanceMatrix", "distance", "count", "distance.lookups (packed)"),
+    ("hashtable", "MyHashTable", "get", "count", "hashtable.get (chaining)"),
+    ("hashtable", "MyHashTable", "get_many", "count_keys", "hashtable.get (chaining)"),
+    ("hashtable", "OpenAddressHashTable", "_find", "count", "hashtable.probe (open)"),
+    ("hashtable", "OpenAddressHashTable", "get_many", "count_keys", "hashtable.probe (open)"),
+    ("truck", None, "find_nearest_stop", "time", "routing.nearest_stop_search"),
+    ("routing", None, "two_opt", "time", "routing.two_opt_pass"),
+    ("routing", None, "or_opt", "time", "routing.or_opt_pass"),
+    ("truck", None, "improve_route", "time", "routing.improve_route"),
+    ("truck", "Truck", "compute_route", "truck", "truck.compute_route"),
+    ("simulation", "DeliverySimulation", "run", "time", "simulation.run"),
+    ("timeline", "DeliveryTimeline", "status_at", "time", "query.status_at"),
+    ("timeline", "DeliveryTimeline", "statuses_at", "time", "query.statuses_at"),
+)
+
+_stats = [] # every Stat, in the order they were first used
+_stat_table = MyHashTable() # stat name -> Stat
+_phase_stats = [] # the Stats phase() has made, there are only ever a handful
+_originals = [] # (owner, function name, original function) for everything enable() swapped out
+_enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+# The Stat for this name (created the first time it's asked for)
+def get_stat(name, timed=False):
+    stat = _stat_table.get(name)
+    if stat is None:
+        stat = Stat(name, timed)
+        _stat_table.insert(name, stat)
+        _stats.append(stat)
+    stat.timed = stat.timed or timed
+    return stat
+
+
+def _counting(func, stat):
+    def wrapper(*args, **kwargs):
+        stat.count += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+# Like _counting, but adds one per key in the batch the function was given
+def _counting_keys(func, stat):
+    def wrapper(self, keys, *args, **kwargs):
+        keys = list(keys)
+        stat.count += len(keys)
+        return func(self, keys, *args, **kwargs)
+    return wrapper
+
+
+def _timing(func, stat):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stat.count += 1
+            stat.seconds += time.perf_counter() - start
+    return wrapper
+
+
+# Like _timing, but keeps a separate Stat for each truck (the first argument of a Truck method is the truck).
+# There are only ever a few trucks, so a short list is the fastest way to find a truck's Stat (and it keeps our own
+# lookups out of the hash table counts).
+def _timing_per_truck(func, stat_name):
+    truck_stats = [] # (truck, Stat)
+
+    def wrapper(truck, *args, **kwargs):
+        stat = None
+        for known_truck, known_stat in truck_stats:
+            if known_truck is truck:
+                stat = known_stat
+                break
+        if stat is None:
+            stat = Stat(f"{stat_name}[{truck.name}]", True)
+            _stats.append(stat)
+            truck_stats.append((truck, stat))
+        start = time.perf_counter()
+        try:
+            return func(truck, *args, **kwargs)
+        finally:
+            stat.count += 1
+            stat.seconds += time.perf_counter() - start
+    return wrapper
+
+
+# Turns instrumentation on by wrapping every function in HOOKS. Calling it twice does nothing the second time.
+def enable():
+    global _enabled
+    if _enabled:
+        return
+    # Make every Stat before swapping anything in, since looking them up uses MyHashTable.get itself
+    wrapped = []
+    for module_name, class_name, function_name, kind, stat_name in HOOKS:
+        module = importlib.import_module(module_name)
+        owner = getattr(module, class_name) if class_name else module
+        original = getattr(owner, function_name)
+        if kind == "count":
+            wrapper = _counting(original, get_stat(stat_name))
+        elif kind == "count_keys":
+            wrapper = _counting_keys(original, get_stat(stat_name))
+        elif kind == "time":
+            wrapper = _timing(original, get_stat(stat_name, timed=True))
+        else:
+            wrapper = _timing_per_truck(original, stat_name)
+        wrapped.append((owner, function_name, original, wrapper))
+
+    for owner, function_name, original, wrapper in wrapped:
+        setattr(owner, function_name, wrapper)
+        _originals.append((owner, function_name, original))
+    _enabled = True
+
+
+# Puts all the original functions back
+def disable():
+    global _enabled
+    while _originals:
+        owner, function_name, original = _originals.pop()
+        setattr(owner, function_name, original)
+    _enabled = False
+
+
+# Zeroes every counter (they stay in the report, just at 0)
+def reset():
+    for stat in _stats:
+        stat.count = 0
+        stat.seconds = 0.0
+
+
+# Times a part of the program: `with phase("route"): ...`. Does nothing when instrumentation is off.
+@contextmanager
+def phase(name):
+    if not _enabled:
+        yield
+        return
+    # Phases are found in a plain list rather than with get_stat, which would count a MyHashTable.get of our own
+    # against the program while the hooks are in
+    stat = None
+    for known_stat in _phase_stats:
+        if known_stat.name == f"phase.{name}":
+            stat = known_stat
+            break
+    if stat is None:
+        stat = Stat(f"phase.{name}", True)
+        _stats.append(stat)
+        _phase_stats.append(stat)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stat.count += 1
+        stat.seconds += time.perf_counter() - start
+
+
+# (name, count, seconds or None) for everything that has happened at least once
+def snapshot():
+    return [(stat.name, stat.count, stat.seconds if stat.timed else None) for stat in _stats if stat.count]
+
+
+# A table of every counter and timer, ready to print
+def report():
+    lines = [f"{'what':<40} {'calls':>12} {'total s':>10} {'avg us':>10}"]
+    for name, count, seconds in snapshot():
+        if seconds is None:
+            lines.append(f"{name:<40} {count:>12,}")
+        else:
+            lines.append(f"{name:<40} {count:>12,} {seconds:>10.4f} {seconds / count * 1e6:>10.1f}")
+    return "\n".join(lines)
@@ -5,12 +5,15 @@ This is the main part of our program that will also include the nice interface f
 of the packages and the total mileage traveled by all the trucks.
 
 Here's a summary of the process and flow of the program:
-- We first load package data from a CSV file (`packages_data.csv`) into a custom hash table.
-- Then we load the address list and distance matrix from their respective CSVs. The addresses are used to match
-  each delivery location to its position (index) in the distance matrix.
-- We create three truck objects, each with a starting time and a list of package IDs.
-- Each truck delivers its assigned packages using the nearest neighbor algorithm (in `truck.py`),
-  which figures out the next closest delivery address based on distance.
+- We first load the distance matrix and the address book from their respective CSVs. The address book maps each
+  delivery address to its position (index) in the distance matrix.
+- Then we load package data from a CSV file (`packages_data.csv`) into a custom hash table, resolving each package's
+  address to its matrix index as we go.
+- We create the trucks (TRUCK_SETUP, each with the earliest time it can leave) and run the day as an event-driven
+  simulation (in `simulation.py`). Whenever a truck and a driver are free, the planner (in `planner.py`) picks its
+  load from the package notes and deadlines, so no package IDs are hand-picked.
+- Each truck delivers its load using the nearest neighbor algorithm (in `truck.py`), which figures out the next
+  closest delivery address based on distance.
 
 As trucks deliver packages, the program:
 - Tracks how far each truck travels
@@ -27,149 +30,302 @@ I should also note that this technically isn't a real-time simulation. Everythin
 statuses are based purely on comparing the user’s input time to the pre-calculated delivery time of each package. Also
 things like load time are instant since they are factored into the mph of the trucks so I won't be coding for that.
 
+Everything is wrapped up in functions (the menu only starts when this file is run directly), so other scripts like
+benchmark.py can import the simulation and the status checks without kicking off the interactive menu.
+
+For scripted checks there's also a batch mode (see batch.py) that skips the menu entirely:
+    python main.py --batch queries.txt --format jsonl
+
+To answer queries over the network instead (for other programs), run `python main.py --serve 8765`.
+
+The delivery log (every truck leaving, every package delivered) normally goes to the screen. Use --event-log FILE to
+write it to a JSON lines file instead (or CSV, if FILE ends in .csv), see events.py. It's only written when the day
+is actually simulated, not when the results come out of the cache.
+
+Add --profile to get a report of where the time went (see instrumentation.py), or --cprofile FILE for full cProfile
+stats.
 """
 
 from packages import load_package_data, package_table
-from truck import Truck
-import csv
-from datetime import datetime
-
-# Helper function: find undelivered packages. This is for when the trucks have already delivered their first batch
-# and need to identify which packages are remaining.
-def find_undelivered_package_ids(package_table, cutoff_time=None):
-    undelivered = [] # start with empty list we can add to as we find undelivered packages
-    for pkg_id in range(1, 41):  # capping it at 40 packages since that is what the assignment calls for
-        pkg = package_table.get(pkg_id)
-        if pkg and pkg.status != "Delivered":
-            if cutoff_time:
-                if not pkg.delivery_time or pkg.delivery_time > cutoff_time:
-                    undelivered.append(pkg_id)
-            else:
-                undelivered.append(pkg_id)
-    return undelivered
-
-# This loads all the package data
-load_package_data('../csv/packages_data.csv')
-
-# Load distance data and address data
-with open('../csv/distances.csv', 'r') as f:
-    distance_data = list(csv.reader(f))
-# This loads the address data.
-with open('../csv/addresses.csv', 'r') as f:
-    address_list = [row[1] for row in csv.reader(f)]  # adjust this index if needed!
-
-# Set up trucks and assign packages (these are example IDs, adjust for your project)
-truck1 = Truck("Truck 1", datetime(2025, 1, 1, 8, 0, 0))  # 8:00 AM start time
-truck2 = Truck("Truck 2", datetime(2025, 1, 1, 9, 5, 0))  # 9:05 AM start time
-#truck3 = Truck("Truck 3", datetime(2025, 1, 1, 10, 20, 0))  # Simulate package 9 fixed by 10:20
-
-#for this part we will load up the trucks with packages via their IDs, prioritizing different packages based on
-# the special notes/delivery deadlines.
-truck1.load_packages([1, 2, 4, 5, 13, 14, 15, 16, 19, 20, 29, 30, 31, 34, 37, 40])  # truck 1 prioritizes the tight deadlines and packages that must be delivered together
-truck2.load_packages([3, 6, 7, 8, 10, 11, 12, 17, 18, 21, 22, 28, 32, 36, 38])  # Waits until 9:05 but does not include package 9 since that will need to be delivered later after 10:20am.
-
-# Display which packages are on each truck before delivery starts
-print("Truck 1 Packages:", [pkg.ID for pkg in truck1.packages])
-print("Truck 2 Packages:", [pkg.ID for pkg in truck2.packages])
-print()  # Just for spacing
-
-
-# Time to deliver the packages
-# We don't use a truck 3 since there are only 2 drivers but rather have truck 1 return and use the same truck
-truck1.deliver_packages(distance_data, address_list)
-truck2.deliver_packages(distance_data, address_list)
-
-
-
-# Once the first batch of packages are delivered, there will still be some packages left at the hub. We need to find
-# them and load them onto truck 1 (which has returned for delivery round 2). First let's identify the remaining packages
-undelivered = find_undelivered_package_ids(package_table)
-truck1.load_packages(undelivered) # Includes package 9 which is a special case (cannot be delivered until after 10:20am since the address isn't known)
-truck1.deliver_packages(distance_data, address_list)
-
-# Sums the mileage from all trucks, staying beneath the 140 mile limit.
-total_miles = truck1.mileage + truck2.mileage
+from truck import Truck, route_cache
+from simulation import DeliverySimulation, AddressCorrection
+from planner import TRUCK_CAPACITY
+from distances import load_distance_matrix
+from addresses import load_address_book
+from shortest_paths import load_shortest_paths
+from result_cache import cache_key, load_results, save_results, apply_results
+from timeline import DeliveryTimeline, DELIVERED, STATUS_NAMES
+from batch import run_batch, BATCH_FORMATS
+from service import serve, DEFAULT_HOST
+import instrumentation
+from instrumentation import phase
+from events import ConsoleEventSink, QuietEventSink, open_event_log, using_event_sink
+from timeclock import at, parse_clock, format_clock
+import argparse
+import contextlib
+import cProfile
+import os
+import sys
+
+# Where the input files live (relative to the src folder, which is where we run the program from)
+DISTANCE_FILE = '../csv/distances.csv'
+ADDRESS_FILE = '../csv/addresses.csv'
+PACKAGE_FILE = '../csv/packages_data.csv'
+
+# Loads all three csv files. Returns the distance matrix and the address book; the packages go into package_table.
+# With shortest_paths=True the distances are replaced by the shortest way between each pair of addresses, which can go
+# through other addresses (the direct road in distances.csv isn't always the shortest).
+def load_data(distance_file=DISTANCE_FILE, address_file=ADDRESS_FILE, package_file=PACKAGE_FILE, shortest_paths=False):
+    # Load distance data and address data. The distances get turned into a DistanceMatrix of floats once, right here,
+    # so the routing loop never has to parse strings (or, for a packed .bin file, memory-mapped without parsing at all).
+    distance_data = load_distance_matrix(distance_file)
+    if shortest_paths:
+        distance_data = load_shortest_paths(distance_data, SHORTEST_PATHS_FILE).matrix
+    # This loads the address data into an address book (address -> distance matrix index).
+    address_book = load_address_book(address_file)
+
+    # This loads all the package data. Each package gets its address turned into a matrix index while it's loaded.
+    load_package_data(package_file, address_book)
+    return distance_data, address_book
+
+# Address fixes we know are coming during the day. Package 9's address is wrong, and the right one (410 S State St)
+# only comes in at 10:20 AM.
+ADDRESS_CORRECTIONS = [
+    AddressCorrection(at(10, 20), 9, "410 S State St", "Salt Lake City", "UT", "84111"),
+]
+
+# The trucks we have: (name, earliest time they can leave). We only use two since there are only 2 drivers.
+TRUCK_SETUP = [
+    ("Truck 1", at(8)),  # 8:00 AM start time (times are seconds since midnight, see timeclock.py)
+    ("Truck 2", at(8)),
+]
+DRIVERS = 2
+
+# Where the simulation results get cached between runs (see result_cache.py). Set the WGUPS_RESULT_CACHE environment
+# variable to use a different file, or to an empty string to always run the simulation.
+RESULT_CACHE_FILE = os.environ.get("WGUPS_RESULT_CACHE", "../.cache/simulation_results.bin")
+# Where the all-pairs shortest paths get saved when the trucks are allowed to take shortcuts (see shortest_paths.py)
+SHORTEST_PATHS_FILE = "../.cache/shortest_paths.bin"
+
+def make_trucks():
+    return [Truck(name, start_time) for name, start_time in TRUCK_SETUP]
+
+# Everything about the trucks that changes the result, written out as text so it can go into the cache key
+def simulation_config_text(trucks, shortest_paths=False):
+    lines = [f"drivers={DRIVERS}", f"capacity={TRUCK_CAPACITY}", f"shortest_paths={shortest_paths}"]
+    for truck in trucks:
+        lines.append(f"{truck.name}|{truck.departure_time}|{truck.speed}|{truck.routing_mode}|"
+                     f"{truck.improve_time_limit}")
+    for correction in ADDRESS_CORRECTIONS:
+        lines.append(f"correction|{correction.time}|{correction.package_id}|{correction.address}|"
+                     f"{correction.city}|{correction.state}|{correction.zip_code}")
+    return "\n".join(lines)
+
+# Runs the whole delivery day and returns the list of trucks (with their final mileage)
+def run_simulation(distance_data, address_book, trucks=None):
+    # Set up the trucks. The start time is the earliest they can leave.
+    if trucks is None:
+        trucks = make_trucks()
+
+    # The simulation runs the day as a series of timed events (trucks leaving, arriving and coming back, delayed
+    # packages showing up, address corrections). What goes on each truck is decided from the special notes and
+    # deadlines whenever a truck is free (see simulation.py and planner.py).
+    packages = package_table.all_packages()
+    simulation = DeliverySimulation(trucks, packages, distance_data, address_book, drivers=DRIVERS,
+                                    corrections=ADDRESS_CORRECTIONS)
+    simulation.run()
+    if simulation.late_package_ids:
+        print("Warning: these packages missed their deadline:", simulation.late_package_ids)
+    if simulation.unplanned_package_ids:
+        print("Warning: these packages could not be put on any truck:", simulation.unplanned_package_ids)
+    return trucks
+
+# Same as run_simulation, but if the csv files and truck setup haven't changed since last time, the saved results are
+# loaded from the cache instead of simulating the whole day again
+def load_or_run_simulation(distance_data, address_book, cache_file=RESULT_CACHE_FILE, shortest_paths=False,
+                           distance_file=DISTANCE_FILE):
+    trucks = make_trucks()
+    if not cache_file:
+        return run_simulation(distance_data, address_book, trucks)
+
+    key = cache_key((PACKAGE_FILE, distance_file, ADDRESS_FILE), simulation_config_text(trucks, shortest_paths))
+    cached = load_results(cache_file, key)
+    if cached is not None and apply_results(cached, package_table, trucks):
+        # The cache only has statuses and times, so the address fixes the simulation would have made go on here
+        for correction in ADDRESS_CORRECTIONS:
+            pkg = package_table.get(correction.package_id)
+            if pkg is not None:
+                correction.apply(pkg, address_book)
+        print(f"Loaded the delivery results from {cache_file} (the input files haven't changed).")
+        return trucks
+
+    run_simulation(distance_data, address_book, trucks)
+    try:
+        save_results(cache_file, key, package_table.all_packages(), trucks)
+    except OSError as error:
+        print(f"Could not save the delivery results to {cache_file}: {error}")
+    return trucks
+
+# Now that every truck is done, the delivery and departure times are final. We build the status timeline once and
+# every status query after this just searches it (see timeline.py).
+def build_timeline(package_table):
+    return DeliveryTimeline(package_table.all_packages())
+
+# Turns a status code from the timeline into the text we show the user
+def describe_status(pkg, status):
+    if status == DELIVERED:
+        return f"Delivered at {format_clock(pkg.delivery_time)}"
+    return STATUS_NAMES[status]
 
 # Now we need to create the interface to check a single package's status at a user-defined time
-def check_single_package_status(user_input, package_id):
+def check_single_package_status(user_input, package_id, delivery_timeline):
     try: # need one big try-except block to catch invalid input errors
-        check_time = datetime.strptime(user_input, "%H:%M").replace(
-            year=2025, month=1, day=1
-        )
+        check_time = parse_clock(user_input) # seconds since midnight
 
-        pkg = package_table.get(package_id)
+        pkg = delivery_timeline.get_package(package_id)
         if not pkg: # need this if statement for if there is no package ID found (greater than or less than 40)
             print(f"No package found with ID {package_id}")
             return
 
-        if pkg.delivery_time and check_time >= pkg.delivery_time:
-            status = f"Delivered at {pkg.delivery_time.strftime('%I:%M %p')}"
-
-        elif pkg.delivery_time and check_time < pkg.delivery_time and check_time >= pkg.departure_time:
-            status = "En route"
-
-        else:
-            status = "At hub"
-
-        print(f"\nPackage {pkg.ID} Status at {check_time.strftime('%I:%M %p')}: {status}\n")
+        status = describe_status(pkg, delivery_timeline.status_at(package_id, check_time))
+        print(f"\nPackage {pkg.ID} Status at {format_clock(check_time)}: {status}\n")
 
     except ValueError: # catches invalid input error and gives user another chance to enter the time
         print("Please enter time in HH:MM format (24-hour clock).")
 
 # This function will display the status of ALL packages.
-def check_all_package_statuses(user_input):
+def check_all_package_statuses(user_input, delivery_timeline):
     try: # including try-except block for errors again
-        check_time = datetime.strptime(user_input, "%H:%M").replace(
-            year=2025, month=1, day=1
-        )
-        print(f"\nPackage statuses at {check_time.strftime('%I:%M %p')}:\n")
-
-        for pkg_id in range(1, 41):  # again assuming 40 packages
-            pkg = package_table.get(pkg_id)
-            if not pkg:
-                continue
-
-            if pkg.delivery_time and check_time >= pkg.delivery_time:
-                status = f"Delivered at {pkg.delivery_time.strftime('%I:%M %p')}"
-            # elif pkg.delivery_time and check_time < pkg.delivery_time and check_time >= datetime(2025, 1, 1, 8, 0):
-            #     status = "En route"
-            elif pkg.delivery_time and check_time < pkg.delivery_time and check_time >= pkg.departure_time: #need this extra constraint to ensure it's not falsely reported as being en route when it's still at the hub
-                status = "En route"
-
-            else:
-                status = "At hub"
+        check_time = parse_clock(user_input)
+        print(f"\nPackage statuses at {format_clock(check_time)}:\n")
 
-            print(f"Package {pkg.ID}: {status}")
+        # One bisect + a few replayed events gives us everyone's status at once (packages come back in ID order)
+        statuses = delivery_timeline.statuses_at(check_time)
+        for pkg, status in zip(delivery_timeline.packages, statuses):
+            print(f"Package {pkg.ID}: {describe_status(pkg, status)}")
 
     except ValueError:
         print("Please enter time in HH:MM format (24-hour clock).")
 
 # Now we'll print the user interface menu. We'll use a loop to allow for multiple uses of the program.
-while True:
-    print("\n==== WGUPS Package Tracker ====")
-    print("1. Get status of a SINGLE package at a specific time")
-    print("2. Get status of ALL packages at a specific time")
-    print("3. Show total mileage of all trucks")
-    print("4. Exit")
-    choice = input("Enter your choice (1–4): ")
-
-    if choice == "1": # simple if/elif statements for the user's choice.
-        time_input = input("Enter a time (HH:MM, 24-hour format): ")
-        try: # Need another try-except block in case the user enters an invalid input.
-            package_id = int(input("Enter the package ID (1–40): "))
-            check_single_package_status(time_input, package_id)
-        except ValueError:
-            print("Invalid package ID.")
-    elif choice == "2":
-        time_input = input("Enter a time (HH:MM, 24-hour format): ")
-        check_all_package_statuses(time_input)
-    elif choice == "3":
-        print("\nMileage Summary:")
-        print(f"Truck 1 mileage: {truck1.mileage:.2f} miles")
-        print(f"Truck 2 mileage: {truck2.mileage:.2f} miles")
-        print(f"\nTotal mileage for all trucks: {total_miles:.2f} miles\n")
-    elif choice == "4":
-        print("Exiting program.")
-        break
-    else:
-        print("Invalid choice. Try again.")
+def run_menu(trucks, delivery_timeline):
+    # Sums the mileage from all trucks, staying beneath the 140 mile limit.
+    total_miles = sum(truck.mileage for truck in trucks)
+
+    while True:
+        print("\n==== WGUPS Package Tracker ====")
+        print("1. Get status of a SINGLE package at a specific time")
+        print("2. Get status of ALL packages at a specific time")
+        print("3. Show total mileage of all trucks")
+        print("4. Exit")
+        choice = input("Enter your choice (1–4): ")
+
+        if choice == "1": # simple if/elif statements for the user's choice.
+            time_input = input("Enter a time (HH:MM, 24-hour format): ")
+            try: # Need another try-except block in case the user enters an invalid input.
+                package_id = int(input("Enter the package ID (1–40): "))
+                check_single_package_status(time_input, package_id, delivery_timeline)
+            except ValueError:
+                print("Invalid package ID.")
+        elif choice == "2":
+            time_input = input("Enter a time (HH:MM, 24-hour format): ")
+            check_all_package_statuses(time_input, delivery_timeline)
+        elif choice == "3":
+            print("\nMileage Summary:")
+            for truck in trucks:
+                print(f"{truck.name} mileage: {truck.mileage:.2f} miles")
+            print(f"\nTotal mileage for all trucks: {total_miles:.2f} miles\n")
+        elif choice == "4":
+            print("Exiting program.")
+            break
+        else:
+            print("Invalid choice. Try again.")
+
+# Command line options. With no options we just show the interactive menu like always.
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="WGUPS package tracker.")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer every query in FILE ('-' for stdin) instead of showing the menu. "
+                             "Each line is a time and a package ID or ALL, e.g. '09:30,14' or '10:25 ALL'")
+    parser.add_argument("--format", choices=BATCH_FORMATS, default="csv", help="output format for --batch")
+    parser.add_argument("--distances", metavar="FILE", default=DISTANCE_FILE,
+                        help="distance table to use: a csv, or a packed binary file made with distances.py")
+    parser.add_argument("--shortest-paths", action="store_true",
+                        help="let trucks take shortcuts through other addresses when the direct road is longer")
+    parser.add_argument("--serve", metavar="PORT", type=int,
+                        help="answer status queries over TCP on PORT instead of showing the menu (see service.py)")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address for --serve to listen on (default: localhost)")
+    parser.add_argument("--event-log", metavar="FILE",
+                        help="write the delivery log to FILE (JSON lines, or CSV if FILE ends in .csv) instead of "
+                             "the screen")
+    parser.add_argument("--profile", action="store_true",
+                        help="count and time the hot spots (distance lookups, hash lookups, routing, queries) and "
+                             "print a report to stderr at the end")
+    parser.add_argument("--cprofile", metavar="FILE", help="also run everything under cProfile and save the stats to FILE")
+    return parser.parse_args(argv)
+
+# Answers a whole file of queries and streams the results to stdout. The delivery log from the simulation is left out
+# (or goes to event_log, if there is one) so stdout only has the answers in it.
+def run_batch_mode(batch_file, output_format, shortest_paths=False, distance_file=DISTANCE_FILE, event_log=None):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with phase("load"):
+            distance_data, address_book = load_data(distance_file, shortest_paths=shortest_paths)
+        with phase("route"), using_event_sink(event_log or QuietEventSink()):
+            load_or_run_simulation(distance_data, address_book, shortest_paths=shortest_paths,
+                                   distance_file=distance_file)
+            delivery_timeline = build_timeline(package_table)
+
+    with phase("query"):
+        if batch_file == "-":
+            answered, skipped = run_batch(sys.stdin, delivery_timeline, sys.stdout, output_format)
+        else:
+            try:
+                with open(batch_file, encoding="utf-8") as lines:
+                    answered, skipped = run_batch(lines, delivery_timeline, sys.stdout, output_format)
+            except FileNotFoundError:
+                print(f"Error: File {batch_file} not found.", file=sys.stderr)
+                return 1
+    print(f"Answered {answered} queries ({skipped} lines skipped).", file=sys.stderr)
+    return 0
+
+def run(args):
+    event_log = open_event_log(args.event_log) if args.event_log else None
+    try:
+        if args.batch:
+            return run_batch_mode(args.batch, args.format, args.shortest_paths, args.distances, event_log)
+
+        with phase("load"):
+            distance_data, address_book = load_data(args.distances, shortest_paths=args.shortest_paths)
+        with phase("route"), using_event_sink(event_log or ConsoleEventSink()):
+            trucks = load_or_run_simulation(distance_data, address_book, shortest_paths=args.shortest_paths,
+                                            distance_file=args.distances)
+            delivery_timeline = build_timeline(package_table)
+    finally:
+        if event_log is not None:
+            event_log.close()
+    with phase("query"):
+        if args.serve is not None:
+            serve(delivery_timeline, trucks, args.host, args.serve)
+        else:
+            run_menu(trucks, delivery_timeline)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    if args.profile:
+        instrumentation.enable()
+    profiler = cProfile.Profile() if args.cprofile else None
+    try:
+        if profiler:
+            return profiler.runcall(run, args)
+        return run(args)
+    finally:
+        if profiler:
+            profiler.dump_stats(args.cprofile)
+            print(f"cProfile stats saved to {args.cprofile}", file=sys.stderr)
+        if args.profile:
+            print("\n" + instrumentation.report(), file=sys.stderr)
+            print(route_cache, file=sys.stderr)
+            instrumentation.disable()
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
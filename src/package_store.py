@@ -0,0 +1,195 @@
+"""
+An optional, even more compact way to keep packages around: a columnar store.
+Instead of one object per package, PackageStore keeps one array per field (all the IDs together, all the weights
+together, and so on). Number fields live in typed arrays from the array module, so a weight costs 8 bytes instead of
+a whole Python int object, and the status is a single byte. Scanning one field for every package in the fleet (like
+"which packages are due before 10:30?") only has to walk that one array.
+
+You can still work with a single package like it's an object: store.get(package_id) gives back a PackageRow, a tiny
+"view" that just remembers which row it points at and reads/writes the columns for you.
+"""
+
+from array import array
+from hashtable import MyHashTable
+from packages import (Package, STATUS_NAMES, format_deadline,
+                      iter_package_batches, DEFAULT_BATCH_SIZE)
+from timeclock import format_clock
+
+# Stand-ins for "no location" and "no time yet" in the integer columns
+NO_LOCATION = -1
+NO_TIME = -1
+
+
+def _time_or_none(value):
+    return None if value == NO_TIME else value
+
+
+class PackageStore:
+    def __init__(self):
+        # Number columns
+        self.ids = array('q')
+        self.zip_codes = array('l')
+        self.deadlines = array('l') # minutes after midnight
+        self.weights = array('l')
+        self.locations = array('l')
+        self.statuses = array('b') # AT_HUB / EN_ROUTE / DELIVERED
+        self.delivery_times = array('q') # clock seconds (see timeclock.py), NO_TIME if not delivered yet
+        self.departure_times = array('q')
+        # Text columns (these are plain lists since they hold objects)
+        self.addresses = []
+        self.cities = []
+        self.states = []
+        self.notes = []
+        self.row_table = MyHashTable() # package ID -> row number
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Goes through every package as a row view
+    def __iter__(self):
+        for row in range(len(self.ids)):
+            yield PackageRow(self, row)
+
+    # Adds a Package (or anything with the same attributes) and returns its row number
+    def append(self, package):
+        row = self.row_table.get(package.ID)
+        if row is not None:
+            raise ValueError(f"Package {package.ID} is already in the store.")
+        row = len(self.ids)
+        self.ids.append(package.ID)
+        self.zip_codes.append(package.zip_code)
+        self.deadlines.append(package.deadline)
+        self.weights.append(package.weight)
+        self.locations.append(NO_LOCATION if package.location is None else package.location)
+        self.statuses.append(STATUS_NAMES.index(package.status))
+        self.addresses.append(package.address)
+        self.cities.append(package.city)
+        self.states.append(package.state)
+        self.notes.append(package.notes)
+        self.delivery_times.append(NO_TIME if package.delivery_time is None else package.delivery_time)
+        self.departure_times.append(NO_TIME if package.departure_time is None else package.departure_time)
+        self.row_table.insert(package.ID, row)
+        return row
+
+    # The row view for a package ID, or None if it isn't in the store
+    def get(self, package_id):
+        row = self.row_table.get(package_id)
+        return None if row is None else PackageRow(self, row)
+
+    # Turns one row back into a normal Package object
+    def to_package(self, row):
+        location = self.locations[row]
+        package = Package(self.ids[row], self.addresses[row], self.cities[row], self.states[row],
+                          self.zip_codes[row], self.deadlines[row], self.weights[row], self.notes[row])
+        package.status = STATUS_NAMES[self.statuses[row]]
+        package.delivery_time = _time_or_none(self.delivery_times[row])
+        package.departure_time = _time_or_none(self.departure_times[row])
+        package.location = None if location == NO_LOCATION else location
+        return package
+
+    # A few whole-fleet scans. Each one only walks the columns it needs.
+    def ids_due_by(self, minutes):
+        return [package_id for package_id, deadline in zip(self.ids, self.deadlines) if deadline <= minutes]
+
+    def ids_with_status(self, status):
+        return [package_id for package_id, code in zip(self.ids, self.statuses) if code == status]
+
+    def total_weight(self):
+        return sum(self.weights)
+
+    # Builds a store straight from a list of packages
+    @classmethod
+    def from_packages(cls, packages):
+        store = cls()
+        for package in packages:
+            store.append(package)
+        return store
+
+    # Streams the package csv straight into a store, batch by batch (see iter_package_batches in packages.py)
+    @classmethod
+    def from_csv(cls, file_path, address_book=None, batch_size=DEFAULT_BATCH_SIZE, rejected_rows=None):
+        store = cls()
+        for batch in iter_package_batches(file_path, batch_size, address_book, rejected_rows):
+            for package in batch:
+                store.append(package)
+        return store
+
+
+# A lightweight stand-in for a Package that reads from (and writes to) one row of a PackageStore
+class PackageRow:
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def ID(self):
+        return self.store.ids[self.row]
+
+    @property
+    def address(self):
+        return self.store.addresses[self.row]
+
+    @property
+    def city(self):
+        return self.store.cities[self.row]
+
+    @property
+    def state(self):
+        return self.store.states[self.row]
+
+    @property
+    def zip_code(self):
+        return self.store.zip_codes[self.row]
+
+    @property
+    def deadline(self):
+        return self.store.deadlines[self.row]
+
+    @property
+    def weight(self):
+        return self.store.weights[self.row]
+
+    @property
+    def notes(self):
+        return self.store.notes[self.row]
+
+    @property
+    def location(self):
+        location = self.store.locations[self.row]
+        return None if location == NO_LOCATION else location
+
+    @location.setter
+    def location(self, value):
+        self.store.locations[self.row] = NO_LOCATION if value is None else value
+
+    # The status is kept as a number in the store but reads and writes as the usual text
+    @property
+    def status(self):
+        return STATUS_NAMES[self.store.statuses[self.row]]
+
+    @status.setter
+    def status(self, value):
+        self.store.statuses[self.row] = STATUS_NAMES.index(value)
+
+    @property
+    def delivery_time(self):
+        return _time_or_none(self.store.delivery_times[self.row])
+
+    @delivery_time.setter
+    def delivery_time(self, value):
+        self.store.delivery_times[self.row] = NO_TIME if value is None else value
+
+    @property
+    def departure_time(self):
+        return _time_or_none(self.store.departure_times[self.row])
+
+    @departure_time.setter
+    def departure_time(self, value):
+        self.store.departure_times[self.row] = NO_TIME if value is None else value
+
+    def __str__(self):
+        return (f"ID: {self.ID} | Address: {self.address}, {self.city}, {self.state} {self.zip_code:05d} | "
+                f"Deadline: {format_deadline(self.deadline)} | Weight: {self.weight}kg | Status: {self.status} | "
+                f"Delivered at: {format_clock(self.delivery_time) if self.delivery_time is not None else 'N/A'}")
@@ -5,59 +5,215 @@ of data we need (address, city, etc.) as attributes.
 That way we can easily access all the information quickly and efficiently (this is why we love OOP).
 We will get the package data from a csv file I created (packages_data.csv), based on the WGUPS Package File Excel sheet
 provided in the instructions.
+
+Packages are read in a streaming way: iter_package_batches() walks the csv one row at a time, checks each row, and hands
+back the good packages in batches of batch_size. Only one batch of packages is held in memory at a time, so even a huge
+manifest file can be loaded without reading the whole thing in first. The one thing kept for the whole file is a plain
+set of the package IDs seen so far, so a repeated ID can be caught (a few dozen bytes per ID, nothing like a package).
+Bad rows aren't silently thrown away anymore either, every one of them gets reported with its line number and what was
+wrong with it.
 """
 
-from hashtable import MyHashTable
+from hashtable import new_hash_table
+from indexes import IndexedPackageTable
+from timeclock import format_clock
 import csv
+import os
+import re
+
+# The three statuses a package can have. The number is the position in STATUS_NAMES (used by the timeline and the
+# columnar PackageStore, which store statuses as small numbers instead of strings).
+AT_HUB = 0
+EN_ROUTE = 1
+DELIVERED = 2
+STATUS_NAMES = ("At hub", "En route", "Delivered")
+
+# Deadlines are stored as minutes after midnight. "EOD" (end of day) becomes midnight at the end of the day.
+EOD_MINUTES = 24 * 60
+
+
+# Turns a deadline like "10:30 AM" (or "EOD") into minutes after midnight
+def parse_deadline(deadline):
+    deadline = deadline.strip().upper()
+    if deadline == "EOD":
+        return EOD_MINUTES
+    clock, am_pm = deadline[:-2].strip(), deadline[-2:]
+    hours, minutes = clock.split(":")
+    hours = int(hours) % 12 + (12 if am_pm == "PM" else 0)
+    return hours * 60 + int(minutes)
+
+
+# Turns minutes after midnight back into the way deadlines are written in the package file
+def format_deadline(minutes):
+    if minutes >= EOD_MINUTES:
+        return "EOD"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours % 12 or 12}:{minutes:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+# I'm storing every attribute required for the assignment in this one object.
+# __slots__ means Python gives each package a fixed set of attribute slots instead of a whole dictionary, which saves a
+# good chunk of memory per package (and it also catches typos in attribute names). Numbers are stored as actual numbers:
+# weight and zip code are ints and the deadline is minutes after midnight.
+#
+# status, address, zip_code and deadline are properties: when one of them changes, the package tells the
+# IndexedPackageTable it's stored in (self.index, see indexes.py) so the secondary indexes never go stale.
+def _indexed_field(name):
+    slot = "_" + name
+
+    def get(self):
+        return getattr(self, slot)
+
+    def set(self, value):
+        if self.index is not None:
+            self.index.field_changed(self, name, getattr(self, slot), value)
+        setattr(self, slot, value)
+    return property(get, set)
+
 
-# I'm storing every attribute required for the assignment in this one object
 class Package:
+    __slots__ = ("ID", "_address", "city", "state", "_zip_code", "_deadline", "weight", "notes",
+                 "_status", "delivery_time", "departure_time", "location", "index")
+
+    status = _indexed_field("status")
+    address = _indexed_field("address")
+    zip_code = _indexed_field("zip_code")
+    deadline = _indexed_field("deadline")
+
     def __init__(self, ID, address, city, state, zip_code, deadline, weight, notes): # constructor
+        self.index = None                  # the IndexedPackageTable this package is in (set when it's inserted)
         self.ID = int(ID)
         self.address = address
         self.city = city
         self.state = state
-        self.zip_code = zip_code
-        self.deadline = deadline
-        self.weight = weight
+        self.zip_code = int(zip_code)
+        self.deadline = deadline if isinstance(deadline, int) else parse_deadline(deadline) # minutes after midnight
+        self.weight = int(weight)          # in kg
         self.notes = notes
         self.status = "At hub"             # Default starting status
-        self.delivery_time = None          # We’ll update this later when delivered
+        self.delivery_time = None          # We’ll update this later when delivered (clock seconds, see timeclock.py)
+        self.departure_time = None         # Set when the package gets loaded on a truck (clock seconds too)
+        self.location = None               # Index of the address in the distance matrix (set when loading)
 
     # Addding this so that I can check the objects by printing their actual data instead of the object's address in memory
     def __str__(self):
-        return (f"ID: {self.ID} | Address: {self.address}, {self.city}, {self.state} {self.zip_code} | "
-                f"Deadline: {self.deadline} | Weight: {self.weight}kg | Status: {self.status} | "
-                f"Delivered at: {self.delivery_time if self.delivery_time else 'N/A'}")
+        return (f"ID: {self.ID} | Address: {self.address}, {self.city}, {self.state} {self.zip_code:05d} | "
+                f"Deadline: {format_deadline(self.deadline)} | Weight: {self.weight}kg | Status: {self.status} | "
+                f"Delivered at: {format_clock(self.delivery_time) if self.delivery_time is not None else 'N/A'}")
 
-# This will be the hash table that will store all our package objects
-package_table = MyHashTable()
+# Which hash table engine stores the packages: "chaining" (MyHashTable, the default) or "open" (OpenAddressHashTable,
+# less memory per package and faster lookups for really big tables). Set the WGUPS_TABLE_ENGINE environment variable
+# to switch engines without touching the code.
+PACKAGE_TABLE_ENGINE = os.environ.get("WGUPS_TABLE_ENGINE", "chaining")
 
-# This function reads in package data from the CSV file and adds it to our hash table
-def load_package_data(file_path):
-    # Will add a try-except block to catch any errors
-    try:
-        with open(file_path, mode='r') as csv_file:
-            reader = csv.reader(csv_file)
-            next(reader)  # Skip the header row
+# This will be the hash table that will store all our package objects. It's wrapped in an IndexedPackageTable so we can
+# also find packages by status, zip code, address or deadline without looking at every package (see indexes.py).
+package_table = IndexedPackageTable(new_hash_table(PACKAGE_TABLE_ENGINE))
 
-            for row in reader:
-                # Just a little sanity check
-                if len(row) < 8:
-                    continue  # If there's not enough data in this row, skip it instead of crashing
+# Looks up the package's address in the address book and stores its distance matrix index on the package
+def resolve_package_location(package, address_book):
+    package.location = address_book.index_of(package.address)
+    if package.location is None:
+        print(f"Warning: address '{package.address}' for package {package.ID} is not in the address book.")
+    return package.location
 
-                # Now we will unpack values from the row.
-                pkg_id, address, city, state, zip_code, deadline, weight, notes = row
+# How many packages we read before inserting them into the hash table in one go
+DEFAULT_BATCH_SIZE = 1000
 
-                # Create a new Package object
-                package = Package(pkg_id, address, city, state, zip_code, deadline, weight, notes)
+# A deadline is either EOD (end of day) or a time like 10:30 AM
+DEADLINE_PATTERN = re.compile(r"^(EOD|(1[0-2]|0?[1-9]):[0-5][0-9] ?[AaPp][Mm])$")
 
-                # Store the object in the hash table using the package ID as the key
-                package_table.insert(package.ID, package)
+
+# A csv row we couldn't turn into a package, and why
+class RejectedRow:
+    def __init__(self, line_number, reason, row):
+        self.line_number = line_number
+        self.reason = reason
+        self.row = row
+
+    def __str__(self):
+        return f"Line {self.line_number}: {self.reason}"
+
+
+# Checks one csv row and returns its 8 cleaned up fields. Raises ValueError (with the reason) if the row is no good.
+def validate_package_row(row):
+    # Excel likes to add empty columns on the end, so those are fine, but any other extra data is not
+    if len(row) < 8 or (len(row) > 8 and any(cell.strip() for cell in row[8:])):
+        raise ValueError(f"expected 8 columns but found {len(row)}")
+    pkg_id, address, city, state, zip_code, deadline, weight, notes = [cell.strip() for cell in row[:8]]
+
+    if not pkg_id.isdigit() or int(pkg_id) < 1:
+        raise ValueError(f"package ID '{pkg_id}' is not a positive whole number")
+    if not address:
+        raise ValueError("address is empty")
+    if not city:
+        raise ValueError("city is empty")
+    if not (zip_code.isdigit() and len(zip_code) == 5):
+        raise ValueError(f"zip code '{zip_code}' is not 5 digits")
+    if not DEADLINE_PATTERN.match(deadline):
+        raise ValueError(f"deadline '{deadline}' is not EOD or a time like 10:30 AM")
+    if not weight.isdigit():
+        raise ValueError(f"weight '{weight}' is not a whole number of kg")
+    return pkg_id, address, city, state, zip_code, deadline, weight, notes
+
+
+# Reads the package csv one row at a time and yields lists of up to batch_size valid Package objects.
+# Any row that fails validation is added to rejected_rows (if a list is given) instead of being loaded. So is a row that
+# reuses a package ID from earlier in the file: the first row with that ID is the one that gets loaded.
+def iter_package_batches(file_path, batch_size=DEFAULT_BATCH_SIZE, address_book=None, rejected_rows=None):
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    with open(file_path, mode='r', newline='', encoding='utf-8-sig') as csv_file:
+        reader = csv.reader(csv_file)
+        next(reader, None)  # Skip the header row
+
+        batch = []
+        seen_ids = set() # every package ID loaded so far, only used to catch duplicates
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue # blank lines aren't errors, just skip them
+            try:
+                fields = validate_package_row(row)
+                package_id = int(fields[0])
+                if package_id in seen_ids:
+                    raise ValueError(f"package ID {package_id} is already used on an earlier line")
+                seen_ids.add(package_id)
+            except ValueError as error:
+                if rejected_rows is not None:
+                    rejected_rows.append(RejectedRow(reader.line_num, str(error), row))
+                continue
+
+            # Create a new Package object
+            package = Package(*fields)
+            if address_book is not None:
+                resolve_package_location(package, address_book)
+            batch.append(package)
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = [] # start a fresh list so the caller can keep (or drop) the old one
+        if batch:
+            yield batch
+
+
+# This function reads in package data from the CSV file and adds it to our hash table. If an address book is given,
+# each package also gets its address resolved to a distance matrix index right away.
+# Returns the list of rows that were rejected (each one is also printed with its line number).
+def load_package_data(file_path, address_book=None, batch_size=DEFAULT_BATCH_SIZE):
+    rejected_rows = []
+    # Will add a try-except block to catch any errors
+    try:
+        for batch in iter_package_batches(file_path, batch_size, address_book, rejected_rows):
+            # Store the whole batch in the hash table using the package ID as the key
+            package_table.insert_many((package.ID, package) for package in batch)
 
     except FileNotFoundError: # Need this in case of any pesky errors.
         print(f"Error: File {file_path} not found. Make sure it's in the right folder.")
 
+    for rejected in rejected_rows:
+        print(f"Skipped bad row in {file_path}. {rejected}")
+    return rejected_rows
+
 # The lookup function for Part B that returns the data components (delivery address, deadline, city, etc.)
 def lookup_package(package_id):
     pkg = package_table.get(package_id)
@@ -0,0 +1,293 @@
+"""
+Automatic load planning.
+Instead of hand-picking which package IDs go on which truck, the planner reads the special notes on every package,
+turns them into rules, and works out the truck loads (and when each truck should leave) by itself.
+
+The notes we understand:
+- "Can only be on truck 2"                                -> the package can only go on that truck
+- "Delayed on flight---will not arrive to depot until 9:05 am" -> the package can't leave the hub before that time
+- "Wrong address listed"                                  -> the package can't leave until its address is fixed
+                                                             (ADDRESS_CORRECTION_TIME unless we're told otherwise)
+- "Must be delivered with 15, 19"                         -> those packages all have to ride on the same truck
+
+Packages that must be delivered together are glued into one group (if 14 needs 15 and 16 needs 13, then 13, 14, 15
+and 16 are all one group). Groups are what actually get loaded.
+
+How the loads get picked:
+1. Whichever truck is free first gets loaded next.
+2. If nothing urgent (a deadline before EOD) is ready to go but something urgent is still on its way to the hub, the
+   truck waits for it. If everything that's left would fit on the truck, it waits for all of it instead of making an
+   extra trip later.
+3. The truck gets filled up to its capacity: earliest deadlines first, then packages that can only go on this truck,
+   and then whatever is closest (on the distance matrix) to the stops already on the truck. That last step grows the
+   load outward like a cluster, so each truck ends up covering one part of town.
+4. The truck's route gets planned when it leaves, and once it's back at the hub it's free again (step 1).
+
+The day itself is run by simulation.py, which calls decide_load whenever a truck is free and uses late_package_ids to
+check each planned route against the deadlines.
+"""
+
+import re
+from timeclock import SECONDS_PER_DAY, SECONDS_PER_MINUTE
+from hashtable import MyHashTable
+from packages import EOD_MINUTES
+
+# How many packages fit on a truck
+TRUCK_CAPACITY = 16
+
+# When a "Wrong address listed" package gets its correct address (the hub is told at 10:20 AM)
+ADDRESS_CORRECTION_TIME = 10 * 60 + 20
+
+TRUCK_ONLY_PATTERN = re.compile(r"can only be on truck\s*(\d+)", re.IGNORECASE)
+DELAYED_PATTERN = re.compile(r"delayed.*?until\s*(\d{1,2}):(\d{2})\s*([ap]m)?", re.IGNORECASE)
+WRONG_ADDRESS_PATTERN = re.compile(r"wrong address", re.IGNORECASE)
+TOGETHER_PATTERN = re.compile(r"must be delivered with\s*([\d,\s]*(?:and\s*\d+)?)", re.IGNORECASE)
+
+
+# The rules we got out of one package's notes
+class PackageConstraints:
+    def __init__(self, truck_number=None, delayed_until=0, wrong_address=False, together_with=()):
+        self.truck_number = truck_number # None means any truck is fine
+        self.delayed_until = delayed_until # minutes after midnight when the package gets to the hub
+        self.wrong_address = wrong_address
+        self.corrected_at = None # when the right address comes in (None = we don't know, assume ADDRESS_CORRECTION_TIME)
+        self.together_with = list(together_with) # IDs of packages that must be on the same truck
+
+    # Minutes after midnight when the package is at the hub with a good address, ready to be loaded
+    @property
+    def available_at(self):
+        if self.wrong_address:
+            corrected_at = self.corrected_at if self.corrected_at is not None else ADDRESS_CORRECTION_TIME
+            return max(self.delayed_until, corrected_at)
+        return self.delayed_until
+
+    def __str__(self):
+        return (f"truck={self.truck_number} available_at={self.available_at} wrong_address={self.wrong_address} "
+                f"together_with={self.together_with}")
+
+
+# Turns the free text notes into a PackageConstraints
+def parse_notes(notes):
+    constraints = PackageConstraints()
+    if not notes:
+        return constraints
+
+    match = TRUCK_ONLY_PATTERN.search(notes)
+    if match:
+        constraints.truck_number = int(match.group(1))
+
+    match = DELAYED_PATTERN.search(notes)
+    if match:
+        hours, minutes, am_pm = int(match.group(1)), int(match.group(2)), (match.group(3) or "").lower()
+        if am_pm:
+            hours = hours % 12 + (12 if am_pm == "pm" else 0)
+        constraints.delayed_until = hours * 60 + minutes
+
+    if WRONG_ADDRESS_PATTERN.search(notes):
+        constraints.wrong_address = True
+
+    match = TOGETHER_PATTERN.search(notes)
+    if match:
+        constraints.together_with = [int(number) for number in re.findall(r"\d+", match.group(1))]
+    return constraints
+
+
+# A bunch of packages that have to travel together (usually just one package)
+class DeliveryGroup:
+    def __init__(self, packages, constraints):
+        self.packages = packages
+        self.constraints = constraints
+        self.package_ids = [pkg.ID for pkg in packages]
+        self.refresh_locations()
+        self.deadline = min(pkg.deadline for pkg in packages)
+        self.available_at = max(rule.available_at for rule in constraints)
+        truck_numbers = set(rule.truck_number for rule in constraints if rule.truck_number is not None)
+        if len(truck_numbers) > 1:
+            raise ValueError(f"Packages {self.package_ids} must go together but are tied to different trucks "
+                             f"{sorted(truck_numbers)}.")
+        self.truck_number = truck_numbers.pop() if truck_numbers else None
+
+    def __len__(self):
+        return len(self.packages)
+
+    # Re-reads where the packages are going (after an address correction, for example)
+    def refresh_locations(self):
+        self.locations = sorted(set(pkg.location for pkg in self.packages))
+
+
+# Simple union-find, used to glue "must be delivered with" packages into groups. Positions are indexes into a list.
+def _find(parents, position):
+    while parents[position] != position:
+        parents[position] = parents[parents[position]]
+        position = parents[position]
+    return position
+
+
+# Parses every package's notes and glues the ones that must be delivered together into DeliveryGroups.
+# corrected_at_table (package ID -> minutes) says when wrong-address packages actually get their new address.
+def build_groups(packages, corrected_at_table=None):
+    position_table = MyHashTable(max(len(packages), 1)) # package ID -> position in packages
+    for position, pkg in enumerate(packages):
+        position_table.insert(pkg.ID, position)
+
+    constraints = [parse_notes(pkg.notes) for pkg in packages]
+    if corrected_at_table is not None:
+        for pkg, rule in zip(packages, constraints):
+            if rule.wrong_address:
+                rule.corrected_at = corrected_at_table.get(pkg.ID)
+    parents = list(range(len(packages)))
+    for position, rule in enumerate(constraints):
+        for other_id in rule.together_with:
+            other = position_table.get(other_id)
+            if other is None:
+                continue # the note points at a package that isn't in today's manifest
+            parents[_find(parents, position)] = _find(parents, other)
+
+    members = [[] for _ in packages]
+    for position in range(len(packages)):
+        members[_find(parents, position)].append(position)
+    return [DeliveryGroup([packages[p] for p in group], [constraints[p] for p in group])
+            for group in members if group]
+
+
+# Picks the groups for one truck load out of `candidates` (all ready to go and allowed on this truck)
+def _fill_load(candidates, truck_number, capacity, distance_data):
+    load = []
+    space = capacity
+    has_urgent = any(group.deadline < EOD_MINUTES for group in candidates)
+
+    # How close each spot is to the load so far (before anything is loaded we measure from the hub). This is kept per
+    # location instead of per group: a group is as close as the closest of its locations, and a day with thousands of
+    # packages still only has a few hundred addresses, so after each pick there's much less to update.
+    locations = [] # every location the candidates go to, once each
+    closeness = [] # same positions as locations
+    location_positions = MyHashTable() # location -> position in locations
+    # The candidates sorted into slots, one for each (deadline, tied to another truck, location). Every slot keeps
+    # its candidates in their original order, so when two picks tie we still take the one that came first.
+    slots = [] # [deadline, tied, location position, candidate indexes]
+    slot_table = MyHashTable() # (deadline, tied, location position) -> slot
+    for i, group in enumerate(candidates):
+        tied = 0 if group.truck_number == truck_number else 1
+        for location in group.locations:
+            position = location_positions.get(location)
+            if position is None:
+                position = len(locations)
+                location_positions.insert(location, position)
+                locations.append(location)
+                closeness.append(distance_data.distance(0, location))
+            slot = slot_table.get((group.deadline, tied, position))
+            if slot is None:
+                slot = [group.deadline, tied, position, []]
+                slot_table.insert((group.deadline, tied, position), slot)
+                slots.append(slot)
+            slot[3].append(i)
+    slots.sort(key=lambda slot: (slot[0], slot[1]))
+    loaded = [False] * len(candidates)
+    loaded_locations = set()
+
+    while True:
+        best = None
+        if not load and not has_urgent:
+            # Nothing urgent: start the cluster at the spot farthest from the hub, then work back inward
+            best_key = None
+            for i, group in enumerate(candidates):
+                if len(group) > space:
+                    continue
+                key = (0 if group.truck_number == truck_number else 1,
+                       -min(closeness[location_positions.get(location)] for location in group.locations))
+                if best_key is None or key < best_key:
+                    best, best_key = i, key
+        else:
+            # Earliest deadline first, then our own packages, then the closest. The slots are in (deadline, tied)
+            # order, so once we have a pick nothing in a later (deadline, tied) can beat it.
+            best_key = None
+            for slot in slots:
+                deadline, tied, position, members = slot
+                if best_key is not None and (deadline, tied) > best_key[:2]:
+                    break
+                while members and loaded[members[0]]:
+                    members.pop(0)
+                for i in members:
+                    if not loaded[i] and len(candidates[i]) <= space:
+                        key = (deadline, tied, closeness[position], i)
+                        if best_key is None or key < best_key:
+                            best, best_key = i, key
+                        break
+        if best is None:
+            break # nothing left fits
+
+        chosen = candidates[best]
+        load.append(chosen)
+        space -= len(chosen)
+        loaded[best] = True
+        # Every spot might be closer to the stops we just added than to anything before it
+        for new_location in chosen.locations:
+            if new_location in loaded_locations:
+                continue
+            loaded_locations.add(new_location)
+            for position, location in enumerate(locations):
+                miles = distance_data.distance(location, new_location)
+                if miles < closeness[position]:
+                    closeness[position] = miles
+    return load
+
+
+# Makes sure every group can actually be delivered by these trucks
+def check_groups(groups, truck_count, capacity):
+    for group in groups:
+        if len(group) > capacity:
+            raise ValueError(f"Packages {group.package_ids} must go together but don't fit on one truck "
+                             f"(capacity {capacity}).")
+        if group.truck_number is not None and not 1 <= group.truck_number <= truck_count:
+            raise ValueError(f"Packages {group.package_ids} need truck {group.truck_number}, "
+                             f"but only {truck_count} trucks are available.")
+
+
+# Decides what truck number `number` should do when it's free at the hub at time `now` (clock turns minutes into the
+# same kind of time as `now`). Returns (load, wait_until):
+# - (list of groups, None): load these and leave now
+# - ([], a time): come back and decide again at that time
+# - ([], None): nothing left that this truck is allowed to take, so it's done for the day
+def decide_load(number, now, waiting, capacity, distance_data, clock):
+    allowed = [group for group in waiting if group.truck_number in (None, number)]
+    if not allowed:
+        return [], None
+    ready = [group for group in allowed if clock(group.available_at) <= now]
+    not_ready = [group for group in allowed if clock(group.available_at) > now]
+
+    # Decide whether it's worth waiting before leaving
+    if not ready:
+        return [], min(clock(group.available_at) for group in not_ready)
+    if not any(group.deadline < EOD_MINUTES for group in ready):
+        urgent_later = [group for group in not_ready if group.deadline < EOD_MINUTES]
+        if urgent_later:
+            return [], min(clock(group.available_at) for group in urgent_later)
+        if not_ready and sum(len(group) for group in allowed) <= capacity:
+            return [], max(clock(group.available_at) for group in not_ready)
+
+    return _fill_load(ready, number, capacity, distance_data), None
+
+
+# The IDs of packages in `groups` that a route gets to after their deadline
+def late_package_ids(groups, route, clock):
+    arrival_table = _arrival_table(route)
+    return [pkg.ID for group in groups for pkg in group.packages
+            if arrival_table.get(pkg.location) > clock(pkg.deadline)]
+
+
+# Returns a function that turns minutes after midnight (deadlines, "delayed until" times) into clock seconds on the
+# same day as `moment` (see timeclock.py)
+def day_clock(moment):
+    day_start = moment - moment % SECONDS_PER_DAY
+    def clock(minutes):
+        return day_start + minutes * SECONDS_PER_MINUTE
+    return clock
+
+
+# location -> arrival time for a planned route
+def _arrival_table(route):
+    table = MyHashTable(max(len(route.visits), 1))
+    for location, _, arrival_time in route.visits:
+        table.insert(location, arrival_time)
+    return table
+
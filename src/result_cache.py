@@ -0,0 +1,112 @@
+"""
+Saving the results of a delivery day so we don't have to simulate it again.
+The simulation always comes out the same for the same input, so if the three csv files and the truck setup haven't
+changed there's no point running it on every launch. After a run we save what the menu needs (every package's status,
+departure and delivery time, plus each truck's mileage) in a small binary file. The next launch works out the key
+again and, if it matches the one in the file, reads the results straight back instead of simulating.
+
+The key is a SHA-256 hash of the contents of the csv files plus a text description of the trucks (names, start times,
+speed, routing mode, drivers, address corrections), so changing any of those means a fresh simulation.
+
+File layout (all little-endian, fixed size records so the file can be memory-mapped and read in place):
+    header:   magic b"WGRC", format version, 32 byte key, package count, truck count
+    packages: package ID, status code, departure time, delivery time (clock seconds, see timeclock.py, -1 = none)
+    trucks:   name (32 bytes, utf-8, zero padded), mileage
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from packages import STATUS_NAMES
+
+CACHE_MAGIC = b"WGRC"
+CACHE_VERSION = 2
+HEADER = struct.Struct("<4sH32sII")
+PACKAGE_RECORD = struct.Struct("<qBqq")
+TRUCK_RECORD = struct.Struct("<32sd")
+NO_TIME = -1
+
+
+# SHA-256 of the input files' contents and the truck setup text
+def cache_key(file_paths, config_text):
+    digest = hashlib.sha256()
+    for path in file_paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        digest.update(b"\0") # so moving bytes from the end of one file to the start of the next changes the key
+    digest.update(config_text.encode("utf-8"))
+    return digest.digest()
+
+
+# What we got back out of a cache file
+class CachedResults:
+    def __init__(self, packages, trucks):
+        self.packages = packages # (package ID, status, departure time, delivery time) with clock seconds (or None)
+        self.trucks = trucks # (name, mileage)
+
+
+def _to_record(seconds):
+    return NO_TIME if seconds is None else seconds
+
+
+def _from_record(value):
+    return None if value == NO_TIME else value
+
+
+# Writes the results to path (through a temporary file, so a crash halfway never leaves a broken cache behind)
+def save_results(path, key, packages, trucks):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, key, len(packages), len(trucks)))
+        for pkg in packages:
+            f.write(PACKAGE_RECORD.pack(pkg.ID, STATUS_NAMES.index(pkg.status), _to_record(pkg.departure_time),
+                                        _to_record(pkg.delivery_time)))
+        for truck in trucks:
+            f.write(TRUCK_RECORD.pack(truck.name.encode("utf-8")[:32], truck.mileage))
+    os.replace(temporary_path, path)
+
+
+# Reads the results back if the file exists and was made with the same key. Returns None otherwise.
+def load_results(path, key):
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if len(data) < HEADER.size:
+                return None
+            magic, version, saved_key, package_count, truck_count = HEADER.unpack_from(data, 0)
+            expected_size = HEADER.size + package_count * PACKAGE_RECORD.size + truck_count * TRUCK_RECORD.size
+            if magic != CACHE_MAGIC or version != CACHE_VERSION or saved_key != key or len(data) != expected_size:
+                return None
+
+            offset = HEADER.size
+            packages = []
+            for package_id, status, departure, delivery in PACKAGE_RECORD.iter_unpack(
+                    data[offset:offset + package_count * PACKAGE_RECORD.size]):
+                packages.append((package_id, STATUS_NAMES[status], _from_record(departure),
+                                 _from_record(delivery)))
+            offset += package_count * PACKAGE_RECORD.size
+            trucks = [(name.rstrip(b"\0").decode("utf-8"), mileage)
+                      for name, mileage in TRUCK_RECORD.iter_unpack(data[offset:])]
+    except (OSError, ValueError):
+        # No file yet, an empty file (mmap can't map 0 bytes) or something unreadable: just simulate again
+        return None
+    return CachedResults(packages, trucks)
+
+
+# Puts the cached statuses and times back onto the packages in the table and the mileage back onto the trucks.
+# Returns False (and changes nothing) if the cache doesn't line up with what's loaded.
+def apply_results(cached, package_table, trucks):
+    if len(cached.trucks) != len(trucks) or any(package_table.get(record[0]) is None for record in cached.packages):
+        return False
+    for package_id, status, departure, delivery in cached.packages:
+        pkg = package_table.get(package_id)
+        pkg.status = status
+        pkg.departure_time = departure
+        pkg.delivery_time = delivery
+    for truck, (name, mileage) in zip(trucks, cached.trucks):
+        truck.mileage = mileage
+    return True
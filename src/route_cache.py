@@ -0,0 +1,127 @@
+"""
+A small cache of planned routes, so planning the same stops from the same place twice doesn't redo the whole nearest
+neighbor search (and the 2-opt/Or-opt passes for "improved" trucks). Reruns and the scenario sweep (where scenarios
+that only differ in speed or departure time load the trucks the same way) end up asking for the exact same route a lot.
+
+A route is stored under (the stops, where the truck starts, routing mode, improve time limit). The stops are kept in
+the order they were given rather than as a set: when two stops are the same distance away, nearest neighbor picks
+whichever one comes first, so the same set of stops in a different order can come out as a different route, and a
+cache should never change what the program prints.
+
+It only keeps the `capacity` most recently used routes. The entries live in a MyHashTable (key -> node) and the nodes
+are also chained together in a doubly linked list from most to least recently used, so a lookup, moving an entry to
+the front and dropping the oldest one are all O(1).
+
+Routes depend on the distances, so the cache remembers which matrix (and which version of it, see
+DistanceMatrix.set_distance) its routes were planned with and empties itself as soon as it's asked about a different
+one.
+"""
+
+from hashtable import MyHashTable
+
+DEFAULT_CAPACITY = 256
+
+
+# One cached route, linked to its neighbors in the recently used list
+class _Node:
+    __slots__ = ("key", "route", "previous", "next")
+
+    def __init__(self, key=None, route=None):
+        self.key = key
+        self.route = route
+        self.previous = None
+        self.next = None
+
+
+class RouteCache:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("A route cache needs room for at least one route.")
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0 # times everything was thrown out because the distances changed
+        self._matrix = None
+        self._matrix_version = None
+        self._clear_entries()
+
+    def _clear_entries(self):
+        self._nodes = MyHashTable(self.capacity)
+        # Two empty nodes at the ends so linking and unlinking never has to check for None
+        self._newest = _Node()
+        self._oldest = _Node()
+        self._newest.next = self._oldest
+        self._oldest.previous = self._newest
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _unlink(self, node):
+        node.previous.next = node.next
+        node.next.previous = node.previous
+
+    def _push_front(self, node):
+        node.previous = self._newest
+        node.next = self._newest.next
+        self._newest.next.previous = node
+        self._newest.next = node
+
+    # Empties the cache if distance_data isn't the matrix (or version of it) the cached routes were planned with
+    def _check_matrix(self, distance_data):
+        version = getattr(distance_data, "version", 0)
+        if distance_data is not self._matrix or version != self._matrix_version:
+            if self._size:
+                self.invalidations += 1
+                self._clear_entries()
+            self._matrix = distance_data
+            self._matrix_version = version
+
+    # The cached route for key (as a new list the caller can change), or None if we don't have it
+    def get(self, key, distance_data):
+        self._check_matrix(distance_data)
+        node = self._nodes.get(key)
+        if node is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._unlink(node)
+        self._push_front(node)
+        return list(node.route)
+
+    # Saves a route, dropping the least recently used one if the cache is full
+    def put(self, key, route, distance_data):
+        self._check_matrix(distance_data)
+        node = self._nodes.get(key)
+        if node is not None:
+            node.route = tuple(route)
+            self._unlink(node)
+            self._push_front(node)
+            return
+        if self._size >= self.capacity:
+            oldest = self._oldest.previous
+            self._unlink(oldest)
+            self._nodes.remove(oldest.key)
+            self._size -= 1
+            self.evictions += 1
+        node = _Node(key, tuple(route))
+        self._nodes.insert(key, node)
+        self._push_front(node)
+        self._size += 1
+
+    # Forgets every route (the counters are kept)
+    def clear(self):
+        self._clear_entries()
+
+    # Zeroes the counters
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self):
+        return (f"route cache: {self.hits} hits, {self.misses} misses ({self.hit_rate():.0%} hit rate), "
+                f"{self.evictions} evicted, {self.invalidations} invalidated, {self._size}/{self.capacity} cached")
@@ -0,0 +1,108 @@
+"""
+Nearest neighbor is quick, but it's greedy: it always grabs the closest stop, and that sometimes leaves a long drive
+back across town at the end. This module takes a finished route and tries to make it shorter with two classic
+"local search" moves:
+
+- 2-opt: take a piece of the route and drive it backwards. This gets rid of routes that cross over themselves.
+- Or-opt: pick up a short run of 1-3 stops and move it somewhere else in the route (either way around).
+
+We keep applying moves that make the route shorter until none of them help anymore (or we run out of time).
+We never re-add up the whole route to check a move. Each move only swaps a few edges, so we just compare the
+length of the edges we'd remove against the edges we'd add (called delta evaluation). That makes every check O(1).
+
+A route here is just a list of distance matrix indexes. The first and last entries are where the truck starts and
+where it has to end up (the hub), and those two never move.
+"""
+
+import time
+
+# A move has to save at least this many miles to count, so floating point noise can't make us loop forever
+IMPROVEMENT_EPSILON = 1e-9
+
+
+# Adds up the length of a route (used for reporting, not inside the search)
+def route_length(route, distance_data):
+    return sum(distance_data.distance(route[i], route[i + 1]) for i in range(len(route) - 1))
+
+
+# One pass of 2-opt. Returns True if it changed the route.
+def two_opt(route, distance_data, deadline=None):
+    dist = distance_data.distance
+    improved = False
+    n = len(route)
+    # i and j are the first and last positions of the piece we reverse. Positions 0 and n-1 are the fixed ends.
+    for i in range(1, n - 2):
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+        a = route[i - 1]
+        b = route[i]
+        for j in range(i + 1, n - 1):
+            c = route[j]
+            d = route[j + 1]
+            # Old edges a-b and c-d become a-c and b-d when route[i..j] is reversed
+            delta = dist(a, c) + dist(b, d) - dist(a, b) - dist(c, d)
+            if delta < -IMPROVEMENT_EPSILON:
+                route[i:j + 1] = route[i:j + 1][::-1]
+                improved = True
+                b = route[i]
+    return improved
+
+
+# One pass of Or-opt. Returns True if it changed the route.
+def or_opt(route, distance_data, deadline=None, max_segment=3):
+    dist = distance_data.distance
+    improved = False
+    for length in range(1, max_segment + 1):
+        i = 1
+        while i + length < len(route):
+            if deadline is not None and time.perf_counter() > deadline:
+                return improved
+            first = route[i]
+            last = route[i + length - 1]
+            before = route[i - 1]
+            after = route[i + length]
+            # How much we save by cutting the segment out and joining its neighbours together
+            removal_gain = dist(before, first) + dist(last, after) - dist(before, after)
+
+            best_delta = -IMPROVEMENT_EPSILON
+            best_position = -1
+            best_reversed = False
+            # Try putting it between every other pair of neighbours p-q that isn't touching the segment
+            for p in range(len(route) - 1):
+                if i - 1 <= p <= i + length - 1:
+                    continue
+                left = route[p]
+                right = route[p + 1]
+                base = dist(left, right)
+                forward = dist(left, first) + dist(last, right) - base - removal_gain
+                backward = dist(left, last) + dist(first, right) - base - removal_gain
+                if forward < best_delta:
+                    best_delta, best_position, best_reversed = forward, p, False
+                if backward < best_delta:
+                    best_delta, best_position, best_reversed = backward, p, True
+
+            if best_position >= 0:
+                segment = route[i:i + length]
+                if best_reversed:
+                    segment.reverse()
+                del route[i:i + length]
+                # Positions after the segment shifted left when we cut it out
+                insert_at = best_position + 1 if best_position < i else best_position + 1 - length
+                route[insert_at:insert_at] = segment
+                improved = True
+            else:
+                i += 1
+    return improved
+
+
+# Keeps running 2-opt and Or-opt passes until neither finds anything or time_limit seconds have passed.
+# Changes the route in place and also returns it.
+def improve_route(route, distance_data, time_limit=1.0):
+    if len(route) < 4:
+        return route # not enough stops in the middle to rearrange
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    while True:
+        improved = two_opt(route, distance_data, deadline)
+        improved = or_opt(route, distance_data, deadline) or improved
+        if not improved or (deadline is not None and time.perf_counter() > deadline):
+            return route
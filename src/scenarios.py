@@ -0,0 +1,171 @@
+"""
+What-if scenario sweeps. Instead of editing main.py to try "what if truck 2 leaves at 8:45?" and running everything
+again, give the sweep a list of values for each setting and it runs every combination and ranks them:
+
+- departure times: when each truck can leave (one time per truck, e.g. ("08:00", "08:45"))
+- speeds:          truck speed in MPH
+- truck counts:    how many trucks there are
+- drivers:         how many of them can be out at once
+- capacities:      how many packages fit on a truck
+- routing modes:   "nearest" or "improved" (see truck.py)
+
+The csv files are read once and shared by every scenario: each scenario gets its own fresh copies of the packages
+(so address corrections and delivery times from one scenario never leak into another) and runs the normal
+event-driven simulation on them. The results come back ranked by missed deadlines first and then total mileage.
+
+From the src folder, for example:
+    python scenarios.py --departures 08:00,08:00 08:00,08:45 08:00,09:05 --speeds 18 25 --trucks 2 3
+"""
+
+import argparse
+import contextlib
+import itertools
+import os
+from events import QuietEventSink, using_event_sink
+from hashtable import MyHashTable
+from packages import Package, package_table
+from planner import TRUCK_CAPACITY
+from simulation import DeliverySimulation
+from timeclock import parse_clock, format_clock
+from truck import Truck, ROUTING_MODES
+
+
+# One combination of settings
+class Scenario:
+    def __init__(self, departure_times, speed=18, truck_count=2, drivers=2, capacity=TRUCK_CAPACITY,
+                 routing_mode="nearest"):
+        self.departure_times = tuple(departure_times) # clock seconds, one per truck (the last one is reused if short)
+        self.speed = speed
+        self.truck_count = truck_count
+        self.drivers = drivers
+        self.capacity = capacity
+        self.routing_mode = routing_mode
+
+    # The departure time for truck `number` (1-based)
+    def departure_time(self, number):
+        return self.departure_times[min(number, len(self.departure_times)) - 1]
+
+    def __str__(self):
+        departures = ",".join(format_clock(self.departure_time(n), "24h") for n in range(1, self.truck_count + 1))
+        return (f"trucks={self.truck_count} drivers={self.drivers} leave={departures} speed={self.speed:g} "
+                f"capacity={self.capacity} routing={self.routing_mode}")
+
+
+# How one scenario turned out. error is set (and the numbers are None) if the scenario couldn't be run at all, like a
+# package that has to be on truck 3 when there are only 2 trucks.
+class ScenarioResult:
+    def __init__(self, scenario, total_miles=None, late_package_ids=(), unplanned_package_ids=(), finish_time=None,
+                 error=None):
+        self.scenario = scenario
+        self.total_miles = total_miles
+        self.late_package_ids = list(late_package_ids)
+        self.unplanned_package_ids = list(unplanned_package_ids)
+        self.finish_time = finish_time # when the last truck got back to the hub
+        self.error = error
+
+    # Packages that missed their deadline or never went out at all
+    def misses(self):
+        return len(self.late_package_ids) + len(self.unplanned_package_ids)
+
+    # Sorting key: scenarios that work come first, then fewest misses, then fewest miles, then earliest finish
+    def rank_key(self):
+        if self.error is not None:
+            return (1, 0, 0, 0)
+        return (0, self.misses(), self.total_miles, self.finish_time)
+
+
+# Every combination of the given values, as Scenario objects. departure_times is a list of tuples (one time per
+# truck), everything else is a list of plain values.
+def scenario_grid(departure_times, speeds=(18,), truck_counts=(2,), drivers=(2,), capacities=(TRUCK_CAPACITY,),
+                  routing_modes=("nearest",)):
+    for mode in routing_modes:
+        if mode not in ROUTING_MODES:
+            raise ValueError(f"Unknown routing mode '{mode}'. Pick one of: {', '.join(ROUTING_MODES)}")
+    scenarios = []
+    seen = MyHashTable() # settings we already have a scenario for
+    for times, speed, count, driver_count, capacity, mode in itertools.product(
+            departure_times, speeds, truck_counts, drivers, capacities, routing_modes):
+        # More drivers than trucks (or departure times for trucks that don't exist) doesn't change anything, so
+        # those combinations would just be the same scenario again
+        scenario = Scenario(times, speed, count, min(driver_count, count), capacity, mode)
+        settings = (tuple(scenario.departure_time(n) for n in range(1, count + 1)), speed, count, scenario.drivers,
+                    capacity, mode)
+        if seen.get(settings) is None:
+            seen.insert(settings, True)
+            scenarios.append(scenario)
+    return scenarios
+
+
+# A fresh copy of a package as it was loaded (at the hub, original address, nothing delivered)
+def copy_package(package):
+    copy = Package(package.ID, package.address, package.city, package.state, package.zip_code, package.deadline,
+                   package.weight, package.notes)
+    copy.location = package.location
+    return copy
+
+
+# Runs one scenario on copies of the packages and returns its ScenarioResult
+def run_scenario(scenario, packages, distance_data, address_book, corrections=()):
+    trucks = [Truck(f"Truck {number}", scenario.departure_time(number), scenario.speed, scenario.routing_mode)
+              for number in range(1, scenario.truck_count + 1)]
+    try:
+        simulation = DeliverySimulation(trucks, [copy_package(pkg) for pkg in packages], distance_data, address_book,
+                                        drivers=scenario.drivers, corrections=corrections, capacity=scenario.capacity)
+    except ValueError as error:
+        return ScenarioResult(scenario, error=str(error))
+    simulation.run()
+    return ScenarioResult(scenario, sum(truck.mileage for truck in trucks), simulation.late_package_ids,
+                          simulation.unplanned_package_ids, max(truck.time for truck in trucks))
+
+
+# Runs every scenario (quietly, without the delivery log) and returns the results best first
+def run_sweep(scenarios, packages, distance_data, address_book, corrections=()):
+    with using_event_sink(QuietEventSink()):
+        results = [run_scenario(scenario, packages, distance_data, address_book, corrections)
+                   for scenario in scenarios]
+    results.sort(key=ScenarioResult.rank_key)
+    return results
+
+
+# The ranked results as a text table
+def format_results(results, limit=None):
+    lines = [f"{'rank':>4}  {'miles':>8}  {'late':>4}  {'unplanned':>9}  {'done at':>8}  scenario"]
+    for rank, result in enumerate(results[:limit] if limit else results, 1):
+        if result.error is not None:
+            lines.append(f"{rank:>4}  {'-':>8}  {'-':>4}  {'-':>9}  {'-':>8}  {result.scenario}  ({result.error})")
+        else:
+            lines.append(f"{rank:>4}  {result.total_miles:>8.2f}  {len(result.late_package_ids):>4}  "
+                         f"{len(result.unplanned_package_ids):>9}  {format_clock(result.finish_time, '24h'):>8}  "
+                         f"{result.scenario}")
+    return "\n".join(lines)
+
+
+# "08:00,08:45" -> (at(8), at(8, 45))
+def parse_departures(text):
+    return tuple(parse_clock(part) for part in text.split(","))
+
+
+def main(argv=None):
+    # Imported here so that importing this module doesn't also load main.py's package table and menu code
+    from main import load_data, ADDRESS_CORRECTIONS
+
+    parser = argparse.ArgumentParser(description="Try out many truck setups at once and rank them.")
+    parser.add_argument("--departures", type=parse_departures, nargs="+", default=[parse_departures("08:00")],
+                        help="departure times, one comma separated list per option, e.g. 08:00,09:05")
+    parser.add_argument("--speeds", type=float, nargs="+", default=[18])
+    parser.add_argument("--trucks", type=int, nargs="+", default=[2], help="truck counts to try")
+    parser.add_argument("--drivers", type=int, nargs="+", default=[2])
+    parser.add_argument("--capacities", type=int, nargs="+", default=[TRUCK_CAPACITY])
+    parser.add_argument("--routing", choices=ROUTING_MODES, nargs="+", default=["nearest"])
+    parser.add_argument("--top", type=int, help="only show this many of the best scenarios")
+    args = parser.parse_args(argv)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        distance_data, address_book = load_data()
+    scenarios = scenario_grid(args.departures, args.speeds, args.trucks, args.drivers, args.capacities, args.routing)
+    results = run_sweep(scenarios, package_table.all_packages(), distance_data, address_book, ADDRESS_CORRECTIONS)
+    print(format_results(results, args.top))
+
+
+if __name__ == "__main__":
+    main()
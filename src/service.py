@@ -0,0 +1,127 @@
+"""
+A small network service for status questions, so other programs can ask about packages without going through the menu.
+It runs on asyncio, which means one thread handles every connection: while one client is waiting on the network the
+others keep getting answered, so thousands of clients can be connected at once without a thread for each one.
+
+The protocol is plain text, one command per line (easy to try out with `nc localhost 8765`):
+
+    STATUS 09:30 14      -> OK 1 then "14 En route"
+    ALL 10:25            -> OK 40 then one "<id> <status> [delivered at]" line per package
+    MILEAGE              -> OK 3 then one line per truck and a "Total" line
+    HELP                 -> OK then the list of commands
+    QUIT                 -> BYE, and the connection is closed
+
+Every answer starts with "OK <number of lines that follow>" or "ERR <what was wrong>". Times are HH:MM (24-hour).
+All the answers come from the finished simulation (the delivery timeline and the trucks' mileage), nothing is
+simulated again while the service runs. By default it only listens on localhost.
+"""
+
+import asyncio
+from packages import DELIVERED, STATUS_NAMES
+from timeclock import parse_clock, format_clock
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_LINE_LENGTH = 1024 # longer lines are a client error, not something to buffer forever
+HELP_LINES = ("STATUS HH:MM ID", "ALL HH:MM", "MILEAGE", "HELP", "QUIT")
+
+
+class StatusService:
+    def __init__(self, delivery_timeline, trucks, day=0):
+        self.timeline = delivery_timeline
+        self.trucks = trucks
+        self.day = day
+        self.connections = 0 # clients connected right now
+        self.commands_answered = 0
+
+    def _moment(self, text):
+        return parse_clock(text, self.day)
+
+    def _describe(self, pkg, status):
+        if status == DELIVERED:
+            return f"{pkg.ID} {STATUS_NAMES[status]} {format_clock(pkg.delivery_time, '24h')}"
+        return f"{pkg.ID} {STATUS_NAMES[status]}"
+
+    # Works out the reply to one command line. Returns (reply lines, whether to close the connection).
+    # This doesn't touch the network at all, so it can be called directly too.
+    def answer(self, line):
+        parts = line.split()
+        if not parts:
+            return ["ERR empty command"], False
+        command, arguments = parts[0].upper(), parts[1:]
+        try:
+            if command == "STATUS" and len(arguments) == 2:
+                moment = self._moment(arguments[0])
+                if not arguments[1].isdigit():
+                    raise ValueError(f"package ID '{arguments[1]}' is not a whole number")
+                package_id = int(arguments[1])
+                status = self.timeline.status_at(package_id, moment)
+                if status is None:
+                    return [f"ERR no package with ID {package_id}"], False
+                return ["OK 1", self._describe(self.timeline.get_package(package_id), status)], False
+            if command == "ALL" and len(arguments) == 1:
+                statuses = self.timeline.statuses_at(self._moment(arguments[0]))
+                return ([f"OK {len(statuses)}"] +
+                        [self._describe(pkg, status) for pkg, status in zip(self.timeline.packages, statuses)]), False
+            if command == "MILEAGE" and not arguments:
+                lines = [f"{truck.name} {truck.mileage:.2f}" for truck in self.trucks]
+                lines.append(f"Total {sum(truck.mileage for truck in self.trucks):.2f}")
+                return [f"OK {len(lines)}"] + lines, False
+            if command == "HELP":
+                return [f"OK {len(HELP_LINES)}"] + list(HELP_LINES), False
+            if command == "QUIT":
+                return ["BYE"], True
+        except ValueError as error:
+            return [f"ERR {error}"], False
+        return [f"ERR unknown command '{line.strip()}' (try HELP)"], False
+
+    # Talks to one client until it sends QUIT or hangs up
+    async def handle_client(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    raw = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    writer.write(b"ERR line too long\n")
+                    break
+                except ConnectionError:
+                    break
+                if not raw:
+                    break # the client hung up
+                reply, close = self.answer(raw.decode("utf-8", errors="replace"))
+                self.commands_answered += 1
+                writer.write(("\n".join(reply) + "\n").encode("utf-8"))
+                await writer.drain() # wait here (not block) if this client reads slowly
+                if close:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        return await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE_LENGTH, backlog=1024)
+
+
+# Runs the service until it's stopped with Ctrl+C
+def serve(delivery_timeline, trucks, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    service = StatusService(delivery_timeline, trucks)
+
+    async def run():
+        server = await service.start(host, port)
+        addresses = ", ".join(f"{socket.getsockname()[0]}:{socket.getsockname()[1]}" for socket in server.sockets)
+        print(f"Status service listening on {addresses} (Ctrl+C to stop)")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Status service stopped.")
+    return service
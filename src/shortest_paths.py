@@ -0,0 +1,146 @@
+"""
+Shortest paths between every pair of addresses.
+distances.csv gives the distance of the direct road between two addresses, but the direct road isn't always the
+shortest way there. Sometimes going A -> C -> B is shorter than A -> B (the table doesn't follow the "triangle
+inequality"). The routing only ever looks up distance(A, B), so it would happily drive the long way.
+
+Floyd-Warshall fixes that up front: for every address k, it checks whether going through k is a shortcut for any pair
+(i, j), and keeps the best distance found so far. It's O(n^3) but only runs once, and after that every lookup during
+routing is still one array read, just with the shorter numbers. We also remember which address each shortcut goes
+through (via), so the actual roads the truck drives can be rebuilt with path().
+
+Instead of three nested loops doing one pair at a time, each step works on a whole row at once (row i through k is
+just d(i, k) + row k), using map() so the inner loop runs in C instead of one Python step per pair.
+
+The result is saved to disk, keyed on a hash of the distance matrix, so it's only worked out again when the distances
+change.
+"""
+
+import hashlib
+import os
+import struct
+from array import array
+from operator import lt
+from distances import DistanceMatrix
+
+NO_VIA = -1 # the direct road is already the shortest way
+SHORTCUT_EPSILON = 1e-9 # ignore "shortcuts" that are only shorter because of floating point rounding
+CACHE_MAGIC = b"WGSP"
+CACHE_VERSION = 1
+HEADER = struct.Struct("<4sH32sI")
+
+
+class ShortestPaths:
+    def __init__(self, matrix, via):
+        self.matrix = matrix # DistanceMatrix of shortest distances, works anywhere a distance matrix does
+        self.via = via # array of ints: via[i * size + j] is an address on the shortest way from i to j (or NO_VIA)
+
+    # Every address the truck passes going from from_index to to_index (both ends included)
+    def path(self, from_index, to_index):
+        size = self.matrix.size
+        path = [from_index]
+        pending = [(from_index, to_index)] # legs still to be broken down, next one on the end
+        while pending:
+            start, end = pending.pop()
+            middle = self.via[start * size + end]
+            if middle == NO_VIA:
+                if end != start:
+                    path.append(end)
+            else:
+                # Do start -> middle first, so push it last
+                pending.append((middle, end))
+                pending.append((start, middle))
+        return path
+
+    # Turns a list of stops into the full list of addresses driven through, stop to stop
+    def expand_route(self, locations):
+        if not locations:
+            return []
+        full_route = [locations[0]]
+        for start, end in zip(locations, locations[1:]):
+            full_route.extend(self.path(start, end)[1:])
+        return full_route
+
+
+# Floyd-Warshall over a DistanceMatrix. Returns a ShortestPaths (the original matrix isn't changed).
+def compute_shortest_paths(matrix):
+    size = matrix.size
+    dist = [matrix.row(i) for i in range(size)]
+    via = [[NO_VIA] * size for _ in range(size)]
+
+    for k in range(size):
+        row_k = dist[k]
+        for i in range(size):
+            row_i = dist[i]
+            d_ik = row_i[k]
+            if i == k or d_ik == float('inf'):
+                continue
+            # The distance from i to every j if we go through k, all at once. Most rows don't get any shortcut from a
+            # given k, so we first just check whether any j does (map + any both run without a Python-level loop).
+            if not any(map(lt, map((d_ik + SHORTCUT_EPSILON).__add__, row_k), row_i)):
+                continue
+            through_k = list(map(d_ik.__add__, row_k))
+            via_i = via[i]
+            for j in range(size):
+                if through_k[j] < row_i[j] - SHORTCUT_EPSILON:
+                    row_i[j] = through_k[j]
+                    via_i[j] = k
+
+    values = array('d')
+    via_values = array('i')
+    for i in range(size):
+        values.extend(dist[i])
+        via_values.extend(via[i])
+    return ShortestPaths(DistanceMatrix(size, values), via_values)
+
+
+# Hash of the distances themselves, so the saved result is only used for exactly the same matrix
+def matrix_key(matrix):
+    return hashlib.sha256(struct.pack("<I", matrix.size) + matrix.values.tobytes()).digest()
+
+
+def save_shortest_paths(path, key, shortest):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, key, shortest.matrix.size))
+        f.write(shortest.matrix.values.tobytes())
+        f.write(shortest.via.tobytes())
+    os.replace(temporary_path, path)
+
+
+# Reads a saved result back, or returns None if there isn't one for this key (or the file is broken)
+def read_shortest_paths(path, key):
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) != HEADER.size:
+                return None
+            magic, version, saved_key, size = HEADER.unpack(header)
+            if magic != CACHE_MAGIC or version != CACHE_VERSION or saved_key != key:
+                return None
+            values = array('d')
+            values.fromfile(f, size * size)
+            via = array('i')
+            via.fromfile(f, size * size)
+    except (OSError, EOFError):
+        return None
+    return ShortestPaths(DistanceMatrix(size, values), via)
+
+
+# The shortest paths for this matrix, from the cache file if it's there and still matches, worked out (and saved)
+# otherwise. cache_path=None skips the cache.
+def load_shortest_paths(matrix, cache_path=None):
+    if cache_path is None:
+        return compute_shortest_paths(matrix)
+    key = matrix_key(matrix)
+    shortest = read_shortest_paths(cache_path, key)
+    if shortest is None:
+        shortest = compute_shortest_paths(matrix)
+        try:
+            save_shortest_paths(cache_path, key, shortest)
+        except OSError as error:
+            print(f"Could not save the shortest paths to {cache_path}: {error}")
+    return shortest
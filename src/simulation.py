@@ -0,0 +1,198 @@
+"""
+Event-driven simulation of the delivery day.
+Instead of calling "deliver truck 1, deliver truck 2, find what's left, reload truck 1" one after the other, the day is
+a list of things that happen at certain times (events), kept in a heap (priority queue) sorted by time. We keep
+popping the earliest event and handling it, and handling an event can add new events for later. The day is over when
+the heap is empty. Every event goes in and out of the heap once, so a day with E events takes O(E log E). Times are
+whole seconds since midnight (see timeclock.py), so the heap only ever compares ints.
+
+The events:
+- PACKAGE_AVAILABLE:  delayed packages reach the hub (e.g. 9:05 AM), so a waiting truck might be able to leave now
+- ADDRESS_CORRECTION: we find out the right address for a package (e.g. package 9 at 10:20 AM)
+- DISPATCH:           a truck that decided to wait checks again whether it should leave
+- TRUCK_DEPART:       a truck gets loaded and leaves the hub (its route is planned right then, together with any
+                      other truck leaving at the same moment, see fleet.py)
+- TRUCK_ARRIVE:       a truck gets to one of its stops and delivers everything there
+- TRUCK_RETURN:       a truck is back at the hub and its driver can take the next truck out
+
+Any number of trucks and drivers can be simulated. A truck can only leave if a driver is free, so with 3 trucks and
+2 drivers there are never more than 2 trucks out at once. What goes on each truck (and whether it's worth waiting) is
+decided with the same rules the planner uses (decide_load in planner.py), just at the moment the truck is free.
+"""
+
+import heapq
+from hashtable import MyHashTable
+from timeclock import SECONDS_PER_DAY, SECONDS_PER_MINUTE
+import events
+from packages import resolve_package_location
+from fleet import compute_fleet_routes
+from planner import TRUCK_CAPACITY, build_groups, check_groups, decide_load, day_clock, late_package_ids
+
+# Event kinds. When two events happen at the same time they're handled in this order, so for example a truck that
+# gets back at 10:20 and a correction that comes in at 10:20 are both done before anyone decides what to load.
+TRUCK_ARRIVE = 0
+TRUCK_RETURN = 1
+ADDRESS_CORRECTION = 2
+PACKAGE_AVAILABLE = 3
+DISPATCH = 4
+TRUCK_DEPART = 5
+EVENT_NAMES = ("truck arrive", "truck return", "address correction", "package available", "dispatch", "truck depart")
+
+
+# A new address for a package that's announced at `time` (clock seconds)
+class AddressCorrection:
+    def __init__(self, time, package_id, address, city, state, zip_code):
+        self.time = time
+        self.package_id = package_id
+        self.address = address
+        self.city = city
+        self.state = state
+        self.zip_code = int(zip_code)
+
+    # Puts the new address on the package and works out its new distance matrix index
+    def apply(self, pkg, address_book):
+        pkg.address = self.address
+        pkg.city = self.city
+        pkg.state = self.state
+        pkg.zip_code = self.zip_code
+        resolve_package_location(pkg, address_book)
+
+
+class DeliverySimulation:
+    # trucks: Truck objects, each one's departure_time is the earliest it can leave. drivers defaults to one per truck.
+    # parallel_routes and route_workers go to fleet.compute_fleet_routes (None lets it decide).
+    def __init__(self, trucks, packages, distance_data, address_book, drivers=None, corrections=(),
+                 capacity=TRUCK_CAPACITY, parallel_routes=None, route_workers=None):
+        self.trucks = trucks
+        self.parallel_routes = parallel_routes
+        self.route_workers = route_workers
+        self.distance_data = distance_data
+        self.address_book = address_book
+        self.free_drivers = len(trucks) if drivers is None else drivers
+        self.capacity = capacity
+        self.clock = day_clock(trucks[0].departure_time) # minutes after midnight -> clock seconds
+        self.events = [] # the heap: (time, kind, sequence number, payload)
+        self.sequence = 0 # breaks ties so the heap never has to compare payloads
+        self.events_processed = 0
+        self.late_package_ids = []
+
+        self.package_table = MyHashTable(max(len(packages), 1)) # package ID -> package
+        for pkg in packages:
+            self.package_table.insert(pkg.ID, pkg)
+
+        # Wrong-address packages become ready when their correction comes in
+        corrected_at_table = MyHashTable()
+        for correction in corrections:
+            minutes = correction.time % SECONDS_PER_DAY // SECONDS_PER_MINUTE
+            corrected_at_table.insert(correction.package_id, minutes)
+            self.schedule(correction.time, ADDRESS_CORRECTION, correction)
+
+        routable = [pkg for pkg in packages if pkg.location is not None]
+        self.unplanned_package_ids = [pkg.ID for pkg in packages if pkg.location is None]
+        self.waiting = build_groups(routable, corrected_at_table)
+        check_groups(self.waiting, len(trucks), capacity)
+        self.group_table = MyHashTable(max(len(routable), 1)) # package ID -> the group it's in
+        for group in self.waiting:
+            for package_id in group.package_ids:
+                self.group_table.insert(package_id, group)
+
+        # Let the trucks know when late packages show up
+        for group in self.waiting:
+            if group.available_at > 0:
+                self.schedule(self.clock(group.available_at), PACKAGE_AVAILABLE, group)
+
+        self.idle = [True] * len(trucks) # which trucks are parked at the hub
+        self.next_check = [None] * len(trucks) # when each waiting truck already has a DISPATCH event coming up
+        for number, truck in enumerate(trucks, 1):
+            self.schedule(truck.departure_time, DISPATCH, number)
+
+    def schedule(self, time, kind, payload):
+        heapq.heappush(self.events, (time, kind, self.sequence, payload))
+        self.sequence += 1
+
+    # Runs the day until there's nothing left to happen
+    def run(self):
+        handlers = (self._truck_arrive, self._truck_return, self._address_correction, self._package_available,
+                    self._dispatch_event, self._trucks_depart)
+        while self.events:
+            time, kind, _, payload = heapq.heappop(self.events)
+            if kind == TRUCK_DEPART:
+                # Every truck leaving at this same moment goes out together, so their routes can be planned at once.
+                # Departures are the last kind of event at any time, so they're all at the top of the heap now.
+                payload = [payload]
+                while self.events and self.events[0][0] == time and self.events[0][1] == TRUCK_DEPART:
+                    payload.append(heapq.heappop(self.events)[3])
+            handlers[kind](time, payload)
+            self.events_processed += len(payload) if kind == TRUCK_DEPART else 1
+
+        # Anything that never left the hub couldn't go on any truck
+        for group in self.waiting:
+            self.unplanned_package_ids.extend(group.package_ids)
+        self.unplanned_package_ids.sort()
+        self.late_package_ids.sort()
+        return self
+
+    def _package_available(self, time, group):
+        self._dispatch(time)
+
+    def _address_correction(self, time, correction):
+        pkg = self.package_table.get(correction.package_id)
+        if pkg is None:
+            return
+        correction.apply(pkg, self.address_book)
+        events.emit(events.DeliveryEvent(events.CORRECTED, None, time, pkg.location, pkg.ID,
+                                         address=f"{pkg.address}, {pkg.city}, {pkg.state} {pkg.zip_code:05d}"))
+        group = self.group_table.get(pkg.ID)
+        if group is not None:
+            group.refresh_locations()
+        self._dispatch(time)
+
+    def _dispatch_event(self, time, number):
+        self._dispatch(time)
+
+    # Gives every parked truck (that's allowed to leave yet) the chance to load up and go, while drivers are free
+    def _dispatch(self, time):
+        for number, truck in enumerate(self.trucks, 1):
+            if self.free_drivers == 0 or not self.waiting:
+                return
+            if not self.idle[number - 1] or time < truck.departure_time:
+                continue
+            load, wait_until = decide_load(number, time, self.waiting, self.capacity, self.distance_data, self.clock)
+            if load:
+                for group in load:
+                    self.waiting.remove(group)
+                self.idle[number - 1] = False
+                self.free_drivers -= 1
+                self.schedule(time, TRUCK_DEPART, (number, load))
+            elif wait_until is not None and wait_until != self.next_check[number - 1]:
+                self.next_check[number - 1] = wait_until
+                self.schedule(wait_until, DISPATCH, number)
+
+    # departures is a (truck number, load) for every truck leaving at `time`
+    def _trucks_depart(self, time, departures):
+        trucks = []
+        for number, load in departures:
+            truck = self.trucks[number - 1]
+            truck.departure_time = time
+            truck.time = time
+            truck.load([pkg for group in load for pkg in group.packages])
+            truck.report_departure()
+            trucks.append(truck)
+
+        routes = compute_fleet_routes(trucks, self.distance_data, self.route_workers, self.parallel_routes)
+        for (number, load), route in zip(departures, routes):
+            self.late_package_ids.extend(late_package_ids(load, route, self.clock))
+            for visit in route.visits:
+                self.schedule(visit[2], TRUCK_ARRIVE, (number, visit))
+            self.schedule(route.finish_time, TRUCK_RETURN, (number, route))
+
+    def _truck_arrive(self, time, payload):
+        number, (location, travel_distance, arrival_time) = payload
+        self.trucks[number - 1].arrive_at_stop(location, travel_distance, arrival_time)
+
+    def _truck_return(self, time, payload):
+        number, route = payload
+        self.trucks[number - 1].return_to_hub(route.return_to_hub_miles, route.finish_time)
+        self.idle[number - 1] = True
+        self.free_drivers += 1
+        self._dispatch(time)
@@ -0,0 +1,99 @@
+"""
+Made-up (synthetic) delivery data for testing how the program holds up at sizes way past the 40 packages and 27
+addresses in the real csv files. Everything is generated from a seed, so the same seed always gives the same data.
+
+- Addresses are points scattered over a square "city". The hub is always address 0, in the middle.
+- Distances are the straight-line distance between two points, rounded to a tenth of a mile like the real table.
+- Packages get a random address, weight and deadline (mostly EOD, some 9:00/10:30 AM like the real file).
+
+write_scenario_csvs() saves a scenario in the same csv layout as the files in the csv folder, so anything that loads
+the real data can load a synthetic scenario too.
+"""
+
+import csv
+import os
+import random
+from addresses import AddressBook
+from distances import DistanceMatrix
+from packages import Package, format_deadline, EOD_MINUTES
+
+# How big (in miles) the square city is
+CITY_SIZE_MILES = 12.0
+
+# Deadlines we hand out, with how likely each one is
+DEADLINE_CHOICES = (9 * 60, 10 * 60 + 30, EOD_MINUTES)
+DEADLINE_WEIGHTS = (1, 4, 15)
+
+
+# Random spots on the map for each address. Index 0 (the hub) sits in the middle.
+def generate_points(address_count, seed=0):
+    rng = random.Random(seed)
+    points = [(CITY_SIZE_MILES / 2, CITY_SIZE_MILES / 2)]
+    for _ in range(address_count - 1):
+        points.append((rng.uniform(0, CITY_SIZE_MILES), rng.uniform(0, CITY_SIZE_MILES)))
+    return points
+
+
+def generate_address_book(address_count):
+    book = AddressBook()
+    book.add(0, "4001 South 700 East") # same hub as the real data
+    for index in range(1, address_count):
+        book.add(index, f"{index} Synthetic Ave")
+    return book
+
+
+# A symmetric distance matrix built from straight-line distances between the generated points
+def generate_distance_matrix(address_count, seed=0):
+    points = generate_points(address_count, seed)
+    matrix = DistanceMatrix(address_count)
+    for i in range(address_count):
+        x1, y1 = points[i]
+        for j in range(i + 1, address_count):
+            x2, y2 = points[j]
+            miles = round(((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5, 1)
+            matrix.set_distance(i, j, miles)
+    return matrix
+
+
+# A list of Package objects spread over addresses 1..address_count-1 (nothing gets delivered to the hub)
+def generate_packages(package_count, address_book, seed=0):
+    rng = random.Random(seed + 1)
+    packages = []
+    for package_id in range(1, package_count + 1):
+        location = rng.randrange(1, len(address_book))
+        deadline = rng.choices(DEADLINE_CHOICES, DEADLINE_WEIGHTS)[0]
+        package = Package(package_id, address_book.address_at(location), "Salt Lake City", "UT",
+                          rng.randrange(84101, 84191), deadline, rng.randint(1, 90), "")
+        package.location = location
+        packages.append(package)
+    return packages
+
+
+# Writes addresses.csv, distances.csv and packages_data.csv for a scenario into directory. Packages are written one
+# at a time, so this also works for manifests far too big to keep in memory.
+def write_scenario_csvs(directory, package_count, address_count, seed=0):
+    os.makedirs(directory, exist_ok=True)
+    book = generate_address_book(address_count)
+    matrix = generate_distance_matrix(address_count, seed)
+
+    with open(os.path.join(directory, "addresses.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        for index in range(address_count):
+            writer.writerow([index, book.address_at(index)])
+
+    with open(os.path.join(directory, "distances.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        for i in range(address_count):
+            # Lower-triangular like the real file: only the entries up to the diagonal are filled in
+            writer.writerow([f"{matrix.distance(i, j):g}" if j <= i else "" for j in range(address_count)])
+
+    rng = random.Random(seed + 1)
+    with open(os.path.join(directory, "packages_data.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "address", "city", "state", "zip", "deadline", "weight", "notes"])
+        for package_id in range(1, package_count + 1):
+            location = rng.randrange(1, address_count)
+            deadline = rng.choices(DEADLINE_CHOICES, DEADLINE_WEIGHTS)[0]
+            writer.writerow([package_id, book.address_at(location), "Salt Lake City", "UT",
+                             rng.randrange(84101, 84191), format_deadline(deadline), rng.randint(1, 90), ""])
+    return book, matrix
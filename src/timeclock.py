@@ -0,0 +1,65 @@
+"""
+The simulation's clock. Every time in the program (when trucks leave, when they get to a stop, when a package was
+delivered, the time the user asks about) is a plain whole number of seconds since midnight at the start of the first
+day. So 8:00 AM is 28800 and 10:20 AM is 37200, and the next day just keeps counting (8:00 AM on day 2 is 115200).
+
+Comparing two times is then comparing two ints, and moving a truck forward is adding an int, with no datetime or
+timedelta objects being made on every step. Times only get turned into text (or a real datetime, for a given date)
+right at the edge, when something is shown to the user or written out.
+"""
+
+from datetime import date, datetime, timedelta
+
+SECONDS_PER_MINUTE = 60
+SECONDS_PER_HOUR = 60 * 60
+SECONDS_PER_DAY = 24 * SECONDS_PER_HOUR
+
+# The date of day 0, only used when a real datetime is needed
+DEFAULT_DATE = date(2025, 1, 1)
+
+
+# The time hours:minutes:seconds on `day` (0 = the first day) in clock seconds, e.g. at(10, 20) is 10:20 AM
+def at(hours, minutes=0, seconds=0, day=0):
+    return day * SECONDS_PER_DAY + hours * SECONDS_PER_HOUR + minutes * SECONDS_PER_MINUTE + seconds
+
+
+# How many whole seconds it takes to drive `miles` at `speed` miles per hour
+def travel_seconds(miles, speed):
+    return round(miles * SECONDS_PER_HOUR / speed)
+
+
+# Turns "HH:MM" (24-hour, like 09:30 or 9:30) into clock seconds on the given day. Raises ValueError if it isn't a
+# real time of day.
+def parse_clock(text, day=0):
+    hours, separator, minutes = text.strip().partition(":")
+    if (not separator or not hours.isdigit() or not minutes.isdigit()
+            or len(hours) > 2 or len(minutes) > 2):
+        raise ValueError(f"time '{text}' is not in HH:MM format")
+    hours, minutes = int(hours), int(minutes)
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"time '{text}' is not a real time of day")
+    return at(hours, minutes, day=day)
+
+
+# Clock seconds as text. "12h" gives 08:06 AM (what the menu and the delivery log show), "24h" gives 08:06.
+# Times after the first day get a "(day N)" on the end.
+def format_clock(seconds, style="12h"):
+    day, seconds = divmod(int(seconds), SECONDS_PER_DAY)
+    hours, seconds = divmod(seconds, SECONDS_PER_HOUR)
+    minutes = seconds // SECONDS_PER_MINUTE
+    if style == "24h":
+        text = f"{hours:02d}:{minutes:02d}"
+    else:
+        text = f"{hours % 12 or 12:02d}:{minutes:02d} {'AM' if hours < 12 else 'PM'}"
+    return text if day == 0 else f"{text} (day {day + 1})"
+
+
+# Clock seconds as a real datetime, counting day 0 as first_date
+def to_datetime(seconds, first_date=DEFAULT_DATE):
+    return datetime.combine(first_date, datetime.min.time()) + timedelta(seconds=seconds)
+
+
+# A datetime back into clock seconds, counting day 0 as first_date
+def from_datetime(moment, first_date=DEFAULT_DATE):
+    delta = moment - datetime.combine(first_date, datetime.min.time())
+    return delta.days * SECONDS_PER_DAY + delta.seconds
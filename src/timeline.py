@@ -0,0 +1,93 @@
+"""
+Once the simulation has finished, every package's day is just two events: the truck it's on leaves the hub (the package
+goes from "At hub" to "En route") and the truck drops it off ("En route" to "Delivered"). Nothing changes after that,
+so instead of re-checking every package's times on every status query, we build a timeline of all those events once,
+sorted by time.
+
+- Status of ONE package at time T: each package keeps its own sorted list of event times, and bisect tells us how many
+  of them have already happened by T. 0 = at hub, 1 = en route, 2 = delivered.
+- Status of ALL packages at time T: every so often we save a copy of everyone's status (one byte per package). To
+  answer a query we bisect to find how many events happened by T, grab the closest snapshot before that point and only
+  replay the events between the snapshot and T.
+
+How often is "every so often"? At least every SNAPSHOT_INTERVAL events, but never more often than once per package
+count. Each snapshot is one byte per package and there are about two events per package, so that keeps the snapshots
+to a few copies in total (O(N) memory instead of N * N / 64). Replaying up to N events is no more work than copying
+the N statuses we hand back anyway.
+"""
+
+from bisect import bisect_right
+from hashtable import MyHashTable
+from packages import AT_HUB, EN_ROUTE, DELIVERED, STATUS_NAMES
+
+# The fewest events between saved snapshots (for big days the package count is used instead, see above)
+SNAPSHOT_INTERVAL = 64
+
+
+class DeliveryTimeline:
+    def __init__(self, packages, snapshot_interval=SNAPSHOT_INTERVAL):
+        # Packages are kept in ID order so "all packages" queries come out sorted
+        self.packages = sorted(packages, key=lambda pkg: pkg.ID)
+        self.position_table = MyHashTable(max(len(self.packages), 1)) # package ID -> position in self.packages
+        self.package_event_times = [] # per package: sorted list of the times its status changes
+        self.snapshot_interval = max(snapshot_interval, len(self.packages))
+
+        events = [] # (time, new status, package position)
+        for position, pkg in enumerate(self.packages):
+            self.position_table.insert(pkg.ID, position)
+            times = []
+            # Same rules the status checks always used: a package only counts as en route/delivered if it got delivered
+            if pkg.delivery_time is not None:
+                departure = pkg.departure_time
+                if departure is not None and departure <= pkg.delivery_time:
+                    times.append(departure)
+                    events.append((departure, EN_ROUTE, position))
+                else:
+                    times.append(pkg.delivery_time) # no departure recorded, so it goes straight to delivered
+                times.append(pkg.delivery_time)
+                events.append((pkg.delivery_time, DELIVERED, position))
+            self.package_event_times.append(times)
+
+        # Sorting by (time, status) means departures come before deliveries that happen at the same moment
+        events.sort(key=lambda event: (event[0], event[1]))
+        self.event_times = [event[0] for event in events]
+        self.event_statuses = [event[1] for event in events]
+        self.event_positions = [event[2] for event in events]
+
+        # snapshots[k] is everyone's status code (one byte each) after the first k * snapshot_interval events
+        self.snapshots = []
+        statuses = bytearray([AT_HUB]) * len(self.packages)
+        for k in range(len(events) + 1):
+            if k % self.snapshot_interval == 0:
+                self.snapshots.append(bytes(statuses))
+            if k < len(events):
+                statuses[self.event_positions[k]] = self.event_statuses[k]
+
+    def __len__(self):
+        return len(self.event_times)
+
+    # The package object for an ID, or None if it isn't on the timeline
+    def get_package(self, package_id):
+        position = self.position_table.get(package_id)
+        return None if position is None else self.packages[position]
+
+    # Status code of a single package at check_time (None if the package doesn't exist)
+    def status_at(self, package_id, check_time):
+        position = self.position_table.get(package_id)
+        if position is None:
+            return None
+        times = self.package_event_times[position]
+        happened = bisect_right(times, check_time)
+        if happened == len(times) and times:
+            return DELIVERED
+        return happened # 0 = at hub, 1 = en route
+
+    # Status codes of every package (in ID order) at check_time
+    def statuses_at(self, check_time):
+        happened = bisect_right(self.event_times, check_time)
+        snapshot_number = happened // self.snapshot_interval
+        statuses = bytearray(self.snapshots[snapshot_number])
+        # Replay only the events between the snapshot and check_time
+        for k in range(snapshot_number * self.snapshot_interval, happened):
+            statuses[self.event_positions[k]] = self.event_statuses[k]
+        return list(statuses)
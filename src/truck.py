@@ -12,82 +12,240 @@ are NOT building a turtle race). The algorithm we will use is the nearest neighb
 and speed of the truck to calculate the delivery time. Once the delivery has been made we will update its delivery time
 and status, which will be stored in the packag ebject. Then at the end we can compare all the delivery times
 and print the status.
+
+Routing works on stops rather than single packages. A stop is one address plus every package on the truck that's going
+there, so when several packages share an address the truck only drives there once and drops them all off at the same
+time. Each step of the nearest neighbor search only has to look at the stops that are left, not every package.
+
+Trucks have a routing mode. "nearest" is the plain nearest neighbor route. "improved" builds the nearest neighbor route
+first and then tightens it up with 2-opt and Or-opt moves (see routing.py) before the truck actually drives it, so the
+delivery times and mileage come from the shorter route.
+
+Trucks don't print anything themselves. Leaving the hub, every delivery, getting back and packages that can't be
+loaded are reported as events to the current event sink (see events.py), which prints them by default but can also
+drop them or write them to a file.
+
+The actual route planning (compute_route) is a plain function: give it the stop locations, the distance matrix, the
+start time and the truck's settings, and it hands back the order, the arrival times and the miles without touching
+any package. The truck then applies that result to its packages. Because nothing is shared while a route is being
+worked out, fleet.py can plan many trucks at once on separate processes and merge the results afterward. Routes that
+were already planned once (same stops, same starting point, same mode) come straight out of route_cache.py.
 """
 from packages import package_table
-import csv
-from datetime import timedelta, datetime
+from hashtable import MyHashTable
+from route_cache import RouteCache
+from routing import improve_route
+from timeclock import travel_seconds
+import events
+
+
+# A single place the truck has to visit, with all the packages that are going there
+class Stop:
+    def __init__(self, location):
+        self.location = location # index in the distance matrix
+        self.packages = []
+
+    def __str__(self):
+        return f"Stop {self.location}: packages {[pkg.ID for pkg in self.packages]}"
+
+
+# The routing modes a truck can use
+ROUTING_MODES = ("nearest", "improved")
+
+# Routes that have already been planned (see route_cache.py). plan_route checks here first.
+route_cache = RouteCache()
+
+
+# Everything that comes out of planning one truck's run
+class RouteResult:
+    def __init__(self, visits, return_to_hub_miles, finish_time):
+        self.visits = visits # (location, miles driven to get there, arrival time) for every stop, in order
+        self.return_to_hub_miles = return_to_hub_miles
+        self.finish_time = finish_time # when the truck is back at the hub
+
+    # Total miles for the run, including the drive back to the hub
+    def miles(self):
+        return sum(leg for _, leg, _ in self.visits) + self.return_to_hub_miles
+
+
+# Find the closest location that hasn't been visited yet and return (position in remaining_locations, distance).
+# Every stop already knows its distance matrix index, so this is all integer lookups.
+def find_nearest_stop(distance_data, from_location, remaining_locations):
+    closest_position = -1
+    min_distance = float('inf')
+
+    for position, location in enumerate(remaining_locations):
+        dist = distance_data.distance(from_location, location)
+        if dist < min_distance:
+            closest_position = position
+            min_distance = dist
+
+    return closest_position, min_distance
+
+
+# Works out the order to visit the stop locations in, starting from start_location.
+# Builds the nearest neighbor route and, in "improved" mode, runs 2-opt/Or-opt over it.
+def plan_route(stop_locations, distance_data, start_location=0, routing_mode="nearest", improve_time_limit=1.0):
+    stop_locations = tuple(stop_locations)
+    cache_key = (stop_locations, start_location, routing_mode, improve_time_limit)
+    route = route_cache.get(cache_key, distance_data)
+    if route is not None:
+        return route
+
+    route = []
+    location = start_location
+    remaining_locations = list(stop_locations)
+    while remaining_locations:
+        position, travel_distance = find_nearest_stop(distance_data, location, remaining_locations)
+        location = remaining_locations.pop(position)
+        route.append(location)
+
+    if routing_mode == "improved" and len(route) > 1:
+        # The improver wants the whole trip: start, every stop, then back to the hub
+        locations = [start_location] + route + [0]
+        improve_route(locations, distance_data, improve_time_limit)
+        route = locations[1:-1]
+    route_cache.put(cache_key, route, distance_data)
+    return route
+
+
+# Plans a truck's whole run without changing anything: the stop order, when it gets to each stop and how far it drives.
+# Times are clock seconds (see timeclock.py), so start_time is an int and so is every arrival time.
+def compute_route(stop_locations, distance_data, start_time, start_location=0, speed=18, routing_mode="nearest",
+                  improve_time_limit=1.0):
+    visits = []
+    location = start_location
+    clock = start_time
+    for next_location in plan_route(stop_locations, distance_data, start_location, routing_mode, improve_time_limit):
+        travel_distance = distance_data.distance(location, next_location)
+        clock += travel_seconds(travel_distance, speed)
+        visits.append((next_location, travel_distance, clock))
+        location = next_location
+
+    # Return to hub (add the miles from going back to the hub)
+    return_to_hub = distance_data.distance(location, 0)
+    clock += travel_seconds(return_to_hub, speed)
+    return RouteResult(visits, return_to_hub, clock)
+
 
 # Truck class simulates a single delivery truck
 class Truck:
-    def __init__(self, name, start_time, speed=18):
+    # table is the hash table the truck grabs its packages from (the shared package_table unless told otherwise)
+    def __init__(self, name, start_time, speed=18, routing_mode="nearest", improve_time_limit=1.0, table=None):
+        if routing_mode not in ROUTING_MODES:
+            raise ValueError(f"Unknown routing mode '{routing_mode}'. Pick one of: {', '.join(ROUTING_MODES)}")
         self.name = name
         self.speed = speed  # in MPH
+        self.routing_mode = routing_mode
+        self.improve_time_limit = improve_time_limit # seconds we let the route improvement run for
+        self.table = table if table is not None else package_table
         self.packages = []
+        self.stops = [] # the packages grouped by address, in the order they were first loaded
+        self._stop_lookup = None
         self.current_location = 0  # We'll assume the hub is always index 0
         self.mileage = 0.0
         self.departure_time = start_time
-        self.time = start_time # datetime object like datetime(2023, 1, 1, 8, 0, 0)
+        self.time = start_time # clock seconds since midnight, like at(8) for 8:00 AM (see timeclock.py)
         self.return_to_hub_miles = 0.0
 
     # Add packages by ID (we'll grab the actual objects from the hash table)
     def load_packages(self, package_ids):
+        self.load([package for package in self.table.get_many(package_ids) if package])
+
+    # Puts these Package objects on the truck (load_packages does the ID lookups and then calls this)
+    def load(self, packages):
         self.packages = []
-        for package_id in package_ids:
-            package = package_table.get(package_id)
-            if package:
-                self.packages.append(package)
-                package.status = "En route"
-                package.departure_time = self.departure_time # need this to make sure the packages status are reported correctly
-
-    # This calculates the distance between two locations using a symmetric distance matrix
+        for package in packages:
+            if package.location is None: # we can't route to an address that isn't in the distance table
+                events.emit(events.DeliveryEvent(events.SKIPPED, self.name, self.time, self.current_location,
+                                                 package.ID, total_miles=self.mileage, address=package.address))
+                continue
+            self.packages.append(package)
+            package.status = "En route"
+            package.departure_time = self.departure_time # need this to make sure the packages status are reported correctly
+        self.stops = self.group_into_stops(self.packages)
+        self._stop_lookup = self.stop_table() # location -> Stop, so arriving at a stop is an O(1) lookup
+
+    # Groups packages by their address so each address becomes one stop. We use our hash table (location -> Stop) so
+    # finding the stop for each package is O(1).
+    def group_into_stops(self, packages):
+        stops = []
+        stop_table = MyHashTable()
+        for package in packages:
+            stop = stop_table.get(package.location)
+            if stop is None:
+                stop = Stop(package.location)
+                stop_table.insert(package.location, stop)
+                stops.append(stop)
+            stop.packages.append(package)
+        return stops
+
+    # This calculates the distance between two locations using a symmetric distance matrix. The DistanceMatrix already
+    # did all the csv parsing and mirroring up front, so this is just an array lookup.
     def get_distance(self, from_index, to_index, distance_data):
-        dist = distance_data[from_index][to_index]
-        if dist == '':
-            dist = distance_data[to_index][from_index]
-        return float(dist)
-
-    # Find the next closest stop and return (package, index, distance)
-    def find_nearest_package(self, distance_data, address_list):
-        closest = None
-        min_distance = float('inf')
-        closest_index = -1
-
-        for pkg in self.packages:
-            if pkg.status != "Delivered":
-                dest_index = address_list.index(pkg.address)
-                dist = self.get_distance(self.current_location, dest_index, distance_data)
-                if dist < min_distance:
-                    closest = pkg
-                    min_distance = dist
-                    closest_index = dest_index
-
-        return closest, closest_index, min_distance
-
-    # Deliver all packages using nearest neighbor routing
-    def deliver_packages(self, distance_data, address_list):
-        while any(pkg.status != "Delivered" for pkg in self.packages):
-            next_pkg, next_index, travel_distance = self.find_nearest_package(distance_data, address_list)
-
-            if next_pkg:
-                # This updates the truck stats
-                self.mileage += travel_distance
-                travel_time = timedelta(hours=travel_distance / self.speed)
-                self.time += travel_time
-
-                # This delivers the package
-                next_pkg.status = "Delivered"
-                next_pkg.delivery_time = self.time
-                self.current_location = next_index
-
-                # Print results
-                print(f"[{self.name}] Delivered Package #{next_pkg.ID} at {self.time.strftime('%I:%M %p')} (miles: {self.mileage:.2f})")
-            #print(f"[{self.name}] Final delivery run complete. Total miles: {self.mileage:.2f}")
-
-
-        # Return to hub (add the miles from going back to the hub)
-        return_to_hub = self.get_distance(self.current_location, 0, distance_data)
+        return distance_data.distance(from_index, to_index)
+
+    # The locations of this truck's stops (what compute_route needs)
+    def stop_locations(self):
+        return [stop.location for stop in self.stops]
+
+    # The stops in the order the truck would visit them, starting from wherever the truck is right now
+    def plan_route(self, distance_data):
+        stop_table = self.stop_table()
+        locations = plan_route(self.stop_locations(), distance_data, self.current_location, self.routing_mode,
+                               self.improve_time_limit)
+        return [stop_table.get(location) for location in locations]
+
+    # location -> Stop for this truck's stops (every stop has its own location)
+    def stop_table(self):
+        stop_table = MyHashTable(max(len(self.stops), 1))
+        for stop in self.stops:
+            stop_table.insert(stop.location, stop)
+        return stop_table
+
+    # Logs that the truck has been loaded and is leaving the hub
+    def report_departure(self):
+        events.emit(events.DeliveryEvent(events.DEPARTED, self.name, self.time, self.current_location,
+                                         total_miles=self.mileage, package_ids=[pkg.ID for pkg in self.packages]))
+
+    # Plans this truck's route right here (see fleet.py for planning lots of trucks at once)
+    def compute_route(self, distance_data):
+        return compute_route(self.stop_locations(), distance_data, self.time, self.current_location, self.speed,
+                             self.routing_mode, self.improve_time_limit)
+
+    # Deliver all packages using nearest neighbor routing (optionally improved), one stop at a time
+    def deliver_packages(self, distance_data):
+        self.apply_route(self.compute_route(distance_data))
+
+    # Drives a planned route: updates the truck's stats and marks every package delivered at its stop's arrival time
+    def apply_route(self, result):
+        for location, travel_distance, arrival_time in result.visits:
+            self.arrive_at_stop(location, travel_distance, arrival_time)
+        self.return_to_hub(result.return_to_hub_miles, result.finish_time)
+
+    # The truck pulls up at one of its stops and delivers every package there at the same time
+    def arrive_at_stop(self, location, travel_distance, arrival_time):
+        next_stop = self._stop_lookup.get(location)
+
+        # This updates the truck stats
+        self.mileage += travel_distance
+        self.time = arrival_time
+        self.current_location = location
+
+        # This delivers every package at this stop at the same time
+        for next_pkg in next_stop.packages:
+            next_pkg.status = "Delivered"
+            next_pkg.delivery_time = self.time
+
+            # Log it (see events.py, by default this prints the same line as always)
+            events.emit(events.DeliveryEvent(events.DELIVERED, self.name, self.time, location, next_pkg.ID,
+                                             travel_distance, self.mileage))
+
+    # Return to hub (add the miles from going back to the hub)
+    def return_to_hub(self, return_to_hub, finish_time):
         self.return_to_hub_miles = return_to_hub
         self.mileage += return_to_hub
-        self.time += timedelta(hours=return_to_hub / self.speed)
+        self.time = finish_time
         self.current_location = 0
-        print(f"[{self.name}] Returning to hub from address index {self.current_location} adds {return_to_hub:.2f} miles for a total of {self.mileage:.2f} miles.")
\ No newline at end of file
+        events.emit(events.DeliveryEvent(events.RETURNED, self.name, self.time, self.current_location,
+                                         miles=return_to_hub, total_miles=self.mileage))